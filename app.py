@@ -1,18 +1,225 @@
 import os
+import time
 import uuid
-import markdown
-from flask import Flask, render_template, request, session
+from flask import Flask, render_template, request, session, jsonify, Response, stream_with_context
 from dotenv import load_dotenv, find_dotenv
 
-# Import your graph and config
-from src.helper import graph
-from src.config import llm_planner, llm_worker
+# Only lightweight modules are imported here. LangChain/LangGraph (via src.helper,
+# src.tracing) and markdown load on first use, so a cold start that only serves
+# `/`, `/how-it-works` or static files never pays for them.
+from src.ratelimit import scheduler_stats
+from src.config import DEFAULT_ANALYSTS, parse_max_analysts
+from src.cache import search_cache_stats, report_cache_stats, report_key, get_report, put_report, count_report
+from src.context import context_stats
+from src.jobs import jobs, sse_stream, JobFlight
+from src import prefetch
+from src.metrics import registry, RENDER_DURATION
 
 # Load Env
 load_dotenv(find_dotenv())
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24) # Required for session management
+# Required for session management. Must be identical in every worker process,
+# otherwise a session cookie signed by one worker is rejected by the next.
+app.secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(24)
+
+APPROVALS = ['approve', 'yes', 'ok', 'go', 'proceed', 'no']
+
+# Report-writing nodes whose LLM tokens are streamed to the browser, and the part of the report they fill
+REPORT_SECTIONS = {"write_introduction": "introduction", "write_report": "insights", "write_conclusion": "conclusion"}
+# Concurrent approvals of the same topic + analysts attach to one running pipeline
+report_runs = JobFlight()
+# Streamed tokens are batched per section so the job store gets a few writes per second, not one per token
+TOKEN_FLUSH_SECONDS = float(os.getenv("TOKEN_FLUSH_SECONDS", 0.1))
+
+def get_graph():
+    # Compiled on the first request that needs it, then cached for the process
+    from src.helper import get_graph as build
+    return build()
+
+# --- RESEARCH JOBS ---
+# These run on the job pool, never on a request thread. Each returns the HTML for the chat bubble.
+
+def format_analysts(analysts, header, footer):
+    response_text = header
+    for i, agent in enumerate(analysts, 1):
+        response_text += f"<b>{i}. {agent.name}</b> ({agent.role})<br><i>{agent.affiliation}</i><br><br>"
+    return response_text + footer
+
+def stream_with_progress(job, graph_input, config, tracer=None, stream_tokens=False):
+    """
+    Runs the graph until it finishes or interrupts, reporting node-level progress to the job.
+    With `stream_tokens`, the report-writing LLM calls are also forwarded as `token` events.
+    """
+    from src.tracing import RunTracer
+
+    graph = get_graph()
+    interviews = {}
+    sections_written = 0
+    run_config = {**config, "callbacks": [tracer or RunTracer()]}
+    modes = ["updates", "messages"] if stream_tokens else ["updates"]
+    pending = {}
+    last_flush = time.monotonic()
+
+    def flush_tokens():
+        for section, text in pending.items():
+            job.emit("token", {"section": section, "text": text})
+        pending.clear()
+
+    for namespace, mode, payload in graph.stream(graph_input, run_config, stream_mode=modes, subgraphs=True):
+        if mode == "messages":
+            chunk, metadata = payload
+            section = REPORT_SECTIONS.get(metadata.get("langgraph_node"))
+            if section and not namespace and isinstance(chunk.content, str) and chunk.content:
+                pending[section] = pending.get(section, "") + chunk.content
+                if time.monotonic() - last_flush >= TOKEN_FLUSH_SECONDS:
+                    flush_tokens()
+                    last_flush = time.monotonic()
+            continue
+
+        # Node finished: send its remaining tokens before the progress message
+        flush_tokens()
+        for node, values in payload.items():
+            if namespace:
+                # Inside an interview subgraph: one namespace per analyst
+                interview = namespace[0]
+                if interview not in interviews:
+                    interviews[interview] = len(interviews) + 1
+                    job.progress(f"🎙️ Interview {interviews[interview]} started")
+                if node == "write_section":
+                    sections_written += 1
+                    job.progress(f"✍️ Interview {interviews[interview]} finished, section written ({sections_written}/{len(interviews)})")
+            elif node == "condense_sections":
+                job.progress(f"🧩 Synthesizing findings ({len(values['memos'])} memos)")
+            elif node == "reuse_interview":
+                job.progress("♻️ Reused an interview from an earlier run")
+            elif node == "create_analysts":
+                job.progress(f"🕵️ Generated {len(values['analysts'])} analysts")
+            elif node in REPORT_SECTIONS:
+                job.progress(f"📝 {node.replace('write_', '').capitalize()} drafted")
+
+    flush_tokens()
+    return graph.get_state(config).values
+
+def compact_thread(config):
+    # While the thread waits for feedback only its latest checkpoint is needed
+    graph = get_graph()
+    if hasattr(graph.checkpointer, "compact"):
+        graph.checkpointer.compact(config["configurable"]["thread_id"])
+
+def resolve_stage(config, session_stage, job_id=None):
+    """
+    Derives the conversation stage from the durable checkpoint, so it is correct
+    whichever worker process serves the request. Without a checkpoint the thread
+    is either still being created by the session's last job or was evicted
+    ('expired') after sitting idle for THREAD_IDLE_TTL. A thread stopped between
+    nodes is 'busy' only while that job runs; if the job failed, the user redoes
+    the step from the last good checkpoint.
+    """
+    running = bool(job_id) and jobs.status(job_id) in ('queued', 'running')
+    state = get_graph().get_state(config)
+    if not state.values:
+        if session_stage != 'waiting_for_feedback':
+            return 'waiting_for_topic'
+        return 'busy' if running else 'expired'
+    if state.next == ('human_feedback',):
+        return 'waiting_for_feedback'
+    if not state.next:
+        return 'waiting_for_topic'
+    if running:
+        return 'busy'
+    # Failed while (re)generating analysts: review the last team again, or start over
+    # when planning failed before there was one
+    return 'waiting_for_feedback' if state.values.get('analysts') else 'waiting_for_topic'
+
+def form_max_analysts(value):
+    # A bad value from the chat form falls back to the default instead of failing the request
+    try:
+        return parse_max_analysts(value)
+    except ValueError:
+        return DEFAULT_ANALYSTS
+
+def run_topic(job, config, topic, max_analysts=DEFAULT_ANALYSTS):
+    job.progress("🧠 Planning analysts...")
+    state = stream_with_progress(job, {"topic": topic, "max_analysts": max_analysts}, config)
+    compact_thread(config)
+    # Opt-in: start the first interview turns while the user reads the list
+    prefetch.start(config["configurable"]["thread_id"], topic, state.get('analysts', []))
+    return {"html": format_analysts(
+        state.get('analysts', []),
+        "<strong>🕵️ I have generated the following analysts for your topic:</strong><br><br>",
+        "⚠️ <b>Feedback required:</b> Type 'Approve' to proceed, or describe any changes you want to make to these personas."
+    )}
+
+def run_feedback(job, config, feedback):
+    # Logic: initiate_all_interviews will see the feedback -> route to create_analysts -> interrupt again.
+    # Speculation for the old team stops; turns of analysts that survive the edit are kept
+    prefetch.cancel(config["configurable"]["thread_id"])
+    get_graph().update_state(config, {"human_analyst_feedback": feedback}, as_node="human_feedback")
+    job.progress("🔄 Updating analysts...")
+    state = stream_with_progress(job, None, config)
+    compact_thread(config)
+    prefetch.start(config["configurable"]["thread_id"], state.get('topic', ''), state.get('analysts', []))
+    return {"html": format_analysts(
+        state.get('analysts', []),
+        f"<strong>🔄 Updated Analysts (based on: '{feedback}'):</strong><br><br>",
+        "⚠️ <b>Feedback required:</b> Type 'Approve' to proceed, or describe further changes."
+    )}
+
+def render_report(final_report, timings=None, cached=False):
+    import markdown
+
+    started = time.perf_counter()
+    html_report = markdown.markdown(final_report)
+    RENDER_DURATION.observe(time.perf_counter() - started)
+    header = "🚀 <b>Research complete</b> (from cache)." if cached else "🚀 <b>Research complete.</b>"
+    # The timing breakdown is informational; the chat UI only renders `html`
+    return {"html": header + "<hr>" + html_report, "timings": timings}
+
+def finish_thread(config):
+    # The thread is done; let the checkpointer evict it on the short TTL
+    prefetch.finish(config["configurable"]["thread_id"])
+    graph = get_graph()
+    if hasattr(graph.checkpointer, "mark_finished"):
+        graph.checkpointer.mark_finished(config["configurable"]["thread_id"])
+
+def thread_report_key(config):
+    values = get_graph().get_state(config).values
+    return report_key(values.get("topic", ""), values.get("analysts", []))
+
+def run_research(job, config):
+    from src.tracing import RunTracer
+
+    # Turns not prefetched yet are done by the real run
+    prefetch.finish(config["configurable"]["thread_id"])
+    key = thread_report_key(config)
+    ran = []
+
+    def research():
+        ran.append(True)
+        # Another process may have finished the same report while this job was queued
+        cached = get_report(key)
+        if cached:
+            count_report("hits")
+            return render_report(cached, cached=True)
+        count_report("misses")
+        # User is happy. Clear feedback so the graph proceeds to interviews -> report -> end.
+        get_graph().update_state(config, {"human_analyst_feedback": None}, as_node="human_feedback")
+        job.progress("🚀 Starting research...")
+        tracer = RunTracer()
+        state = stream_with_progress(job, None, config, tracer, stream_tokens=True)
+        final_report = state.get('final_report', '')
+        if final_report:
+            put_report(key, final_report)
+        return render_report(final_report, tracer.breakdown())
+
+    result = report_runs.run(key, job, research)
+    if not ran:
+        count_report("coalesced")
+    finish_thread(config)
+    return result
+
+# --- ROUTES ---
 
 @app.route("/")
 def index():
@@ -26,92 +233,85 @@ def index():
 def how_it_works():
     return render_template('how_it_works.html')
 
+@app.route("/stats")
+def stats():
+    # LLM scheduler queues, search cache hit rates and prompt tokens saved by context compaction
+    return jsonify({
+        "llm": scheduler_stats(),
+        "search_cache": search_cache_stats(),
+        "report_cache": report_cache_stats(),
+        "context": context_stats(),
+    })
+
+@app.route("/metrics")
+def metrics():
+    # Prometheus scrape endpoint (per worker process)
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 @app.route("/get", methods=["POST"])
 def chat():
+    """Submits the next step of the conversation as a background job and returns its id."""
     user_input = request.form["msg"]
-    thread_id = session.get('thread_id')
-    current_stage = session.get('stage')
-    
+    thread_id = session.get('thread_id') or str(uuid.uuid4())
     config = {"configurable": {"thread_id": thread_id}}
-    response_text = ""
+    current_stage = resolve_stage(config, session.get('stage'), session.get('job_id'))
 
-    try:
-        # --- STAGE 1: User provides TOPIC ---
-        if current_stage == 'waiting_for_topic':
-            # Run graph to generate analysts
-            initial_state = {"topic": user_input, "max_analysts": 3}
-            
-            # Run until the first interruption (human_feedback node)
-            events = list(graph.stream(initial_state, config, stream_mode="values"))
-            
-            # Extract the latest state with analysts
-            final_event = events[-1]
-            analysts = final_event.get('analysts', [])
-            
-            # Format the Analyst List for the Chat UI
-            response_text += "<strong>🕵️ I have generated the following analysts for your topic:</strong><br><br>"
-            for i, agent in enumerate(analysts, 1):
-                response_text += f"<b>{i}. {agent.name}</b> ({agent.role})<br><i>{agent.affiliation}</i><br><br>"
-            
-            response_text += "⚠️ <b>Feedback required:</b> Type 'Approve' to proceed, or describe any changes you want to make to these personas."
-            
-            # Update State
+    if current_stage == 'busy':
+        return jsonify({"error": "⏳ Still working on your previous message. Please wait."}), 409
+    if current_stage == 'expired':
+        session['stage'] = 'waiting_for_topic'
+        session['thread_id'] = str(uuid.uuid4())
+        return jsonify({"error": "⌛ This research session expired. Please send your topic again."}), 410
+
+    # --- STAGE 1: User provides TOPIC ---
+    if current_stage == 'waiting_for_topic':
+        if get_graph().get_state(config).values:
+            # The previous thread finished; start a fresh one for the new topic
+            thread_id = str(uuid.uuid4())
+            config = {"configurable": {"thread_id": thread_id}}
+        job = jobs.submit(run_topic, config, user_input, form_max_analysts(request.form.get("max_analysts")))
+        session['stage'] = 'waiting_for_feedback'
+
+    # --- STAGE 2: User provides FEEDBACK (HITL) ---
+    else:
+        feedback = user_input.strip()
+
+        # === OPTION A: APPROVAL ===
+        if feedback.lower() in APPROVALS:
+            cached = get_report(thread_report_key(config))
+            if cached:
+                # Same topic and analysts were researched recently: answer right away
+                count_report("hits")
+                finish_thread(config)
+                session['stage'] = 'waiting_for_topic'
+                session['thread_id'] = str(uuid.uuid4())
+                return jsonify(render_report(cached, cached=True))
+            job = jobs.submit(run_research, config)
+            # Reset for next topic; the job keeps the old thread's config
+            session['stage'] = 'waiting_for_topic'
+            thread_id = str(uuid.uuid4())
+
+        # === OPTION B: REQUEST CHANGES ===
+        else:
+            job = jobs.submit(run_feedback, config, feedback)
+            # STAY in the feedback stage
             session['stage'] = 'waiting_for_feedback'
 
-        # --- STAGE 2: User provides FEEDBACK (HITL) ---
-        elif current_stage == 'waiting_for_feedback':
-            feedback = user_input.strip()
-            
-            # === OPTION A: APPROVAL ===
-            if feedback.lower() in ['approve', 'yes', 'ok', 'go', 'proceed', 'no']:
-                # User is happy. Clear feedback so the graph proceeds to research.
-                graph.update_state(config, {"human_analyst_feedback": None}, as_node="human_feedback")
-                
-                status_msg = "🚀 <b>Starting Research...</b><br><i>This may take 2-3 minutes. Please stay on this page.</i>"
-                final_report = ""
-
-                # Run the graph. It will proceed to interviews -> report -> end.
-                for event in graph.stream(None, config, stream_mode="values"):
-                    if 'final_report' in event:
-                        final_report = event['final_report']
-
-                # If we got a final report, we are done
-                if final_report:
-                    html_report = markdown.markdown(final_report)
-                    response_text = status_msg + "<hr>" + html_report
-                    
-                    # Reset for next topic
-                    session['stage'] = 'waiting_for_topic'
-                    session['thread_id'] = str(uuid.uuid4())
-            
-            # === OPTION B: REQUEST CHANGES ===
-            else:
-                # User wants changes. Update state with their feedback.
-                graph.update_state(config, {"human_analyst_feedback": feedback}, as_node="human_feedback")
-                
-                # Run the graph. 
-                # Logic: initiate_all_interviews will see the feedback -> route to create_analysts -> interrupt again.
-                events = list(graph.stream(None, config, stream_mode="values"))
-                
-                # The last event contains the NEW analysts generated using your feedback
-                final_event = events[-1]
-                
-                if 'analysts' in final_event:
-                    analysts = final_event['analysts']
-                    response_text += f"<strong>🔄 Updated Analysts (based on: '{feedback}'):</strong><br><br>"
-                    for i, agent in enumerate(analysts, 1):
-                        response_text += f"<b>{i}. {agent.name}</b> ({agent.role})<br><i>{agent.affiliation}</i><br><br>"
-                    
-                    response_text += "⚠️ <b>Feedback required:</b> Type 'Approve' to proceed, or describe further changes."
-                    
-                    # STAY in the feedback stage
-                    session['stage'] = 'waiting_for_feedback'
-
-    except Exception as e:
-        print(f"Error: {e}")
-        response_text = "❌ An error occurred. Please refresh the page and try again."
-
-    return response_text
+    session['thread_id'] = thread_id
+    session['job_id'] = job.id
+    return jsonify({"job_id": job.id})
+
+@app.route("/events/<job_id>")
+def events(job_id):
+    """Server-Sent Events: `progress` while the job runs, then `result` or `error`."""
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    return Response(
+        stream_with_context(sse_stream(job)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=8080, debug=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=8080, debug=True, threaded=True)
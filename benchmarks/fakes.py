@@ -0,0 +1,218 @@
+"""Deterministic stand-ins for Groq, Tavily and Wikipedia used by the offline benchmark."""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import PrivateAttr
+
+WORDS = ("market adoption latency throughput regulation cost energy hardware model data "
+         "safety benchmark supply chain policy research capital growth risk").split()
+
+# --- COUNTERS ---
+
+class CallCounter:
+    """Thread-safe tally of fake provider calls, shared by all fakes of one benchmark run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {}
+
+    def add(self, name: str, **values):
+        with self._lock:
+            entry = self.counts.setdefault(name, {})
+            for key, value in values.items():
+                entry[key] = entry.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(entry) for name, entry in self.counts.items()}
+
+# --- ERRORS ---
+
+class FakeRateLimitError(Exception):
+    """Looks like groq.RateLimitError to src.llm.is_rate_limited."""
+    status_code = 429
+
+# --- CHAT MODEL ---
+
+def _seeded(*parts) -> random.Random:
+    return random.Random(hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest())
+
+def _filler(rng: random.Random, tokens: int) -> str:
+    # ~1 token per word is close enough for budgeting purposes
+    return " ".join(rng.choice(WORDS) for _ in range(tokens))
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model with configurable latency, output size and injected 429s.
+
+    Outputs depend only on the prompt, so runs are reproducible. Structured output
+    is supported by answering the bound tool with values synthesised from its schema.
+    """
+
+    name: str = "fake"
+    latency: float = 0.05
+    latency_per_token: float = 0.0
+    output_tokens: int = 120
+    rate_limit_probability: float = 0.0
+    seed: int = 0
+    counter: Any = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    _throttle_rng: random.Random = PrivateAttr(default=None)
+    _throttle_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    def model_post_init(self, __context):
+        self._throttle_rng = random.Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _throttled(self) -> bool:
+        with self._throttle_lock:
+            return self._throttle_rng.random() < self.rate_limit_probability
+
+    def bind_tools(self, tools, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        tools: Optional[list] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        message = self._respond(messages, tools)
+        time.sleep(self.latency + self.latency_per_token * self.output_tokens)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        tools: Optional[list] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._respond(messages, tools)
+        time.sleep(self.latency)
+        if message.tool_calls:
+            call = message.tool_calls[0]
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}],
+                usage_metadata=message.usage_metadata,
+            ))
+            return
+        # One chunk per word, usage on the last one as the Groq stream reports it
+        words = re.findall(r"\S+\s*", message.content) or [""]
+        for i, word in enumerate(words):
+            time.sleep(self.latency_per_token)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word,
+                usage_metadata=message.usage_metadata if i == len(words) - 1 else None,
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(word, chunk=chunk)
+            yield chunk
+
+    def _respond(self, messages: List[BaseMessage], tools: Optional[list]) -> AIMessage:
+        prompt = get_buffer_string(messages)
+        input_tokens = len(prompt) // 4
+        rng = _seeded(self.seed, prompt)
+
+        # Injected throttling draws from its own seeded stream so retries can succeed
+        if self.rate_limit_probability and self._throttled():
+            if self.counter:
+                self.counter.add(self.name, calls=1, rate_limited=1)
+            raise FakeRateLimitError("Rate limit reached (injected)")
+
+        if tools:
+            tool = tools[0]["function"]
+            args = self._tool_args(tool, prompt, rng)
+            message = AIMessage(content="", tool_calls=[{"name": tool["name"], "args": args, "id": f"call_{rng.randrange(1 << 30)}"}])
+        else:
+            message = AIMessage(content=self._text(prompt, rng))
+
+        output_tokens = self.output_tokens
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        if self.counter:
+            self.counter.add(self.name, calls=1, input_tokens=input_tokens, output_tokens=output_tokens)
+        return message
+
+    def _text(self, prompt: str, rng: random.Random) -> str:
+        body = _filler(rng, self.output_tokens)
+        if "Lead Research Editor" in prompt:
+            return f"# Report\n\n## Executive Summary\n{body}\n\n## Key Insights\n{body} [1]\n\n## Sources\n[1] https://example.com/source"
+        if "Introduction or Conclusion" in prompt:
+            header = "Conclusion" if "Write conclusion" in prompt else "Introduction"
+            return f"## {header}\n{body}"
+        return body
+
+    def _tool_args(self, tool: dict, prompt: str, rng: random.Random) -> dict:
+        if tool["name"] == "Perspectives":
+            match = re.search(r"Pick the top (\d+) themes", prompt)
+            count = int(match.group(1)) if match else 3
+            return {"analysts": [
+                {
+                    "affiliation": f"Institute {i}",
+                    "name": f"Analyst {i}",
+                    "role": f"{rng.choice(WORDS).capitalize()} specialist",
+                    "description": f"Focuses on {_filler(rng, 12)}",
+                }
+                for i in range(1, count + 1)
+            ]}
+        return self._from_schema(tool.get("parameters", {}), rng)
+
+    def _from_schema(self, schema: dict, rng: random.Random):
+        kind = schema.get("type")
+        if kind == "object":
+            return {k: self._from_schema(v, rng) for k, v in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self._from_schema(schema.get("items", {"type": "string"}), rng)]
+        if kind in ("integer", "number"):
+            return rng.randint(1, 5)
+        if kind == "boolean":
+            return rng.random() < 0.5
+        return _filler(rng, 4)
+
+# --- SEARCH TOOLS ---
+
+class FakeSearch:
+    """Replaces fetch_tavily / fetch_wikipedia with deterministic documents."""
+
+    def __init__(self, source: str, latency: float = 0.2, docs: int = 3, doc_tokens: int = 400,
+                 counter: CallCounter = None, seed: int = 0, space: int = 50):
+        self.source = source
+        self.space = space
+        self.latency = latency
+        self.docs = docs
+        self.doc_tokens = doc_tokens
+        self.counter = counter
+        self.seed = seed
+
+    def __call__(self, query: str) -> list:
+        time.sleep(self.latency)
+        if self.counter:
+            self.counter.add(self.source, calls=1)
+        rng = _seeded(self.seed, self.source, query)
+        # Small URL space so overlapping queries return overlapping documents
+        ids = [rng.randrange(self.space) for _ in range(self.docs)]
+        if self.source == "wikipedia":
+            return [{"source": f"https://en.wikipedia.org/wiki/Page_{i}", "page_content": _filler(_seeded(i), self.doc_tokens)} for i in ids]
+        return [{"url": f"https://example.com/article/{i}", "content": _filler(_seeded(i), self.doc_tokens)} for i in ids]
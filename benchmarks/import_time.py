@@ -0,0 +1,63 @@
+"""
+Import-time budget for the web app's cold start.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and fails
+when importing `app` takes longer than the budget or pulls in any of the heavy
+dependencies that must only load on first use (LangChain, LangGraph, Groq,
+Tavily, markdown).
+
+    python -m benchmarks.import_time --budget-ms 400
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# Top-level packages that must not be imported by `import app`
+HEAVY_MODULES = ("langchain", "langchain_core", "langchain_community", "langchain_groq",
+                 "langgraph", "groq", "tavily", "openai", "tiktoken", "markdown")
+
+LINE_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+def measure(module: str, runs: int = 3) -> tuple:
+    """Best-of-`runs` cumulative import time (ms) of `module` and every module it imported."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")])))
+    best, imported = None, set()
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True, env=env)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        for line in result.stderr.splitlines():
+            match = LINE_PATTERN.match(line)
+            if not match:
+                continue
+            cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+            imported.add(name)
+            if name == module and not indent:
+                best = cumulative if best is None else min(best, cumulative)
+    return (best or 0) / 1000, imported
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 400)))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    elapsed_ms, imported = measure(args.module, args.runs)
+    heavy = sorted(name for name in imported if name.split(".")[0] in HEAVY_MODULES)
+
+    print(f"import {args.module}: {elapsed_ms:.0f} ms (budget {args.budget_ms:.0f} ms), {len(imported)} modules")
+    failed = False
+    if heavy:
+        print(f"  FAIL heavy modules imported eagerly: {', '.join(heavy[:10])}{' ...' if len(heavy) > 10 else ''}")
+        failed = True
+    if elapsed_ms > args.budget_ms:
+        print(f"  FAIL over budget by {elapsed_ms - args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Offline end-to-end benchmark of the research graph.
+
+Swaps the Groq models (via src.config.override) and the Tavily/Wikipedia
+fetchers in src.helper for the deterministic fakes in benchmarks/fakes.py,
+drives the graph through the full
+topic -> approve -> report flow for several concurrent users and writes the
+measurements to a JSON file so runs can be compared over time.
+
+    python -m benchmarks.run_benchmark --topics 3 --analysts 3 --users 2 --output bench.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# --- TIMING ---
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 4),
+        "p50": round(rank(50), 4),
+        "p90": round(rank(90), 4),
+        "p99": round(rank(99), 4),
+        "max": round(ordered[-1], 4),
+    }
+
+# --- SETUP ---
+
+def install_fakes(args, counter):
+    """Points src.config/src.helper at fake models/tools wrapped in the real scheduler."""
+    import src.helper as helper
+    from src import config
+    from src.llm import PooledChatModel, ScheduledChatModel
+    from src.ratelimit import get_scheduler
+    from benchmarks.fakes import FakeChatModel, FakeSearch
+
+    def pooled(name, latency):
+        # One member per simulated API key, each with its own rate limits, as in src.config
+        members = []
+        for key in range(args.keys):
+            model = FakeChatModel(
+                name=name,
+                latency=latency,
+                output_tokens=args.output_tokens,
+                rate_limit_probability=args.rate_limit_probability,
+                seed=args.seed + key,
+                counter=counter,
+            )
+            scheduler = get_scheduler(f"fake-{name}#{key + 1}", rpm=args.rpm, tpm=args.tpm, max_concurrency=args.max_concurrency)
+            members.append(ScheduledChatModel(inner=model, scheduler=scheduler, max_throttle_retries=0))
+        return PooledChatModel(members=members)
+
+    planner = pooled("planner", args.planner_latency)
+    worker = pooled("worker", args.worker_latency)
+
+    # llm_worker and the query planner are derived from worker_model on first use
+    config.override(llm_planner=planner, worker_model=worker)
+    helper.fetch_tavily = FakeSearch("tavily", latency=args.search_latency, doc_tokens=args.doc_tokens, counter=counter, seed=args.seed, space=args.doc_space)
+    helper.fetch_wikipedia = FakeSearch("wikipedia", latency=args.search_latency, doc_tokens=args.doc_tokens * 4, counter=counter, seed=args.seed, space=args.doc_space)
+    return helper.get_graph()
+
+def run_session(graph, topic, analysts, tracer, stream_tokens=False):
+    """
+    One user researching one topic: generate analysts, approve, write the report.
+    With `stream_tokens` the report is written with LLM message streaming on, as in the
+    web app; returns the run time and the number of streamed message chunks.
+    """
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}, "callbacks": [tracer]}
+    start = time.perf_counter()
+    graph.invoke({"topic": topic, "max_analysts": analysts}, config)
+    graph.update_state(config, {"human_analyst_feedback": None}, as_node="human_feedback")
+    chunks = 0
+    if stream_tokens:
+        for _, mode, _ in graph.stream(None, config, stream_mode=["updates", "messages"], subgraphs=True):
+            chunks += mode == "messages"
+        state = graph.get_state(config).values
+    else:
+        state = graph.invoke(None, config)
+    if not state.get("final_report"):
+        raise RuntimeError(f"No report produced for {topic!r}")
+    return time.perf_counter() - start, chunks
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+# --- MAIN ---
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--topics", type=int, default=2, help="Distinct topics; every user researches each one")
+    parser.add_argument("--analysts", type=int, default=3, help="max_analysts per topic")
+    parser.add_argument("--users", type=int, default=2, help="Concurrent users")
+    parser.add_argument("--planner-latency", type=float, default=0.2)
+    parser.add_argument("--worker-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--output-tokens", type=int, default=150, help="Tokens produced per fake LLM call")
+    parser.add_argument("--doc-tokens", type=int, default=300, help="Size of each fake web document")
+    parser.add_argument("--doc-space", type=int, default=8, help="Distinct fake documents per source; smaller means more overlap between turns")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Chance that a fake LLM call returns a 429")
+    parser.add_argument("--keys", type=int, default=1, help="Simulated API keys per role; the rate limits apply per key")
+    parser.add_argument("--rpm", type=float, default=6000)
+    parser.add_argument("--tpm", type=float, default=10_000_000)
+    parser.add_argument("--max-concurrency", type=int, default=16)
+    parser.add_argument("--stream-tokens", action="store_true", help="Write reports with LLM message streaming, as the web app does")
+    parser.add_argument("--reuse-interviews", action="store_true", help="Let users with the same topic share memoized interviews")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Isolated caches/checkpoints so every run starts cold and touches nothing real.
+    # No API keys are needed: the real clients are never created.
+    os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="research-bench-"))
+    # Fake analysts are identical across users, so by default every run interviews them afresh
+    os.environ["INTERVIEW_CACHE"] = "1" if args.reuse_interviews else "0"
+
+    from benchmarks.fakes import CallCounter
+    counter = CallCounter()
+    graph = install_fakes(args, counter)
+
+    from src.cache import search_cache_stats
+    from src.context import context_stats
+    from src.helper import interview_stats
+    from src.ratelimit import scheduler_stats
+    from src.tracing import RunTracer
+
+    # One tracer shared by all sessions; it also feeds the Prometheus metrics
+    tracer = RunTracer()
+    topics = [f"Benchmark topic {i}: trends in {['AI chips', 'solar storage', 'gene therapy', 'quantum networks'][i % 4]}" for i in range(args.topics)]
+    sessions = [topic for _ in range(args.users) for topic in topics]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    run_times, failures, streamed = [], [], 0
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(run_session, graph, topic, args.analysts, tracer, args.stream_tokens) for topic in sessions]
+        for future in futures:
+            try:
+                run_time, chunks = future.result()
+                run_times.append(run_time)
+                streamed += chunks
+            except Exception as e:
+                failures.append(repr(e))
+    wall_time = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    calls = counter.snapshot()
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "config": vars(args),
+        "wall_time_s": round(wall_time, 3),
+        "runs": {"completed": len(run_times), "failed": len(failures), "errors": failures[:5], "latency_s": percentiles(run_times)},
+        "nodes": {node: percentiles(values) for node, values in sorted(tracer.durations.items())},
+        "llm": {
+            "calls": {name: calls.get(name, {}) for name in ("planner", "worker")},
+            "total_calls": sum(calls.get(n, {}).get("calls", 0) for n in ("planner", "worker")),
+            "retries": tracer.llm["retries"],
+            "streamed_chunks": streamed,
+            "total_tokens": sum(calls.get(n, {}).get("input_tokens", 0) + calls.get(n, {}).get("output_tokens", 0) for n in ("planner", "worker")),
+            "schedulers": {k: v for k, v in scheduler_stats().items() if k.startswith("fake-")},
+        },
+        "search": {"calls": {name: calls.get(name, {}) for name in ("tavily", "wikipedia")}, "cache": search_cache_stats()},
+        "context": context_stats(),
+        "interviews": interview_stats(),
+        "peak_memory_mb": round(peak / 1024 / 1024, 2),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{len(run_times)}/{len(sessions)} runs in {wall_time:.1f}s "
+          f"({results['llm']['total_calls']} LLM calls, {results['llm']['total_tokens']} tokens, "
+          f"peak {results['peak_memory_mb']} MB) -> {args.output}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Headless batch research: runs a JSONL file of topics through the research graph.
+
+Each input line is {"topic": ..., "max_analysts": 3, "auto_approve": true,
+"feedback": "...", "id": "..."} where everything but `topic` is optional.
+Topics run concurrently on a bounded worker pool; all of them share the
+process-wide rate-limit schedulers, so total time is bounded by provider quota.
+Every finished topic is appended to the output JSONL with its final report
+and timing breakdown. Thread ids are derived from the input, so rerunning the
+same command after an interruption skips finished topics and resumes the others
+from their last checkpoint.
+
+    python -m src.batch topics.jsonl --output reports.jsonl --workers 8
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.config import DEFAULT_ANALYSTS, parse_max_analysts
+from src.cache import report_key, get_report, put_report, count_report
+from src.helper import get_graph
+from src.tracing import RunTracer
+
+# --- CONFIGURATION ---
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", 8))
+
+# --- INPUT / OUTPUT ---
+
+def load_topics(path: str, default_analysts: int = DEFAULT_ANALYSTS, auto_approve: bool = True) -> list:
+    """Parses the input JSONL into normalized items; the same topic and settings appear once."""
+    items = {}
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: invalid JSON ({e})")
+            if isinstance(entry, str):
+                entry = {"topic": entry}
+            topic = (entry.get("topic") or "").strip()
+            if not topic:
+                raise ValueError(f"{path}:{line_number}: missing 'topic'")
+            try:
+                value = entry.get("max_analysts")
+                max_analysts = parse_max_analysts(default_analysts if value in (None, "") else value)
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: {e}")
+            item = {
+                "topic": topic,
+                "max_analysts": max_analysts,
+                "auto_approve": bool(entry.get("auto_approve", auto_approve)),
+                "feedback": entry.get("feedback") or "",
+            }
+            item["id"] = str(entry.get("id") or hashlib.sha1(
+                f"{topic}\x00{max_analysts}\x00{item['feedback']}".encode()
+            ).hexdigest()[:16])
+            items.setdefault(item["id"], item)
+    return list(items.values())
+
+def load_finished(path: str) -> set:
+    """Ids that already have a report in the output file (the latest record per id wins)."""
+    status = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # a line cut off by the interruption
+                status[record.get("id")] = record.get("status")
+    return {item_id for item_id, s in status.items() if s == "done"}
+
+class OutputWriter:
+    """Appends one JSON record per line; each record is flushed as soon as it is written."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a+", encoding="utf-8")
+        self._lock = threading.Lock()
+        # Terminate a record cut off by a crash so the next one starts on its own line
+        if self._file.tell():
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+# --- RUNNING ---
+
+def thread_id(item: dict) -> str:
+    return f"batch-{item['id']}"
+
+def run_item(item: dict) -> dict:
+    """Runs (or resumes) one topic and returns its output record."""
+    graph = get_graph()
+    config = {"configurable": {"thread_id": thread_id(item)}}
+    tracer = RunTracer()
+    run_config = {**config, "callbacks": [tracer]}
+    record = {"id": item["id"], "topic": item["topic"], "max_analysts": item["max_analysts"], "thread_id": thread_id(item)}
+
+    state = graph.get_state(config)
+    if not state.values:
+        graph.invoke({"topic": item["topic"], "max_analysts": item["max_analysts"]}, run_config)
+        if item["feedback"]:
+            graph.update_state(config, {"human_analyst_feedback": item["feedback"]}, as_node="human_feedback")
+            graph.invoke(None, run_config)
+    elif state.next and state.next != ("human_feedback",):
+        # Interrupted mid-run: continue from the last checkpoint
+        graph.invoke(None, run_config)
+    state = graph.get_state(config)
+
+    values = state.values
+    if state.next == ("human_feedback",):
+        analysts = [a.name for a in values.get("analysts", [])]
+        if not item["auto_approve"]:
+            # Left at the interrupt; rerun with auto_approve to write the report
+            return {**record, "status": "awaiting_approval", "analysts": analysts, "timings": tracer.breakdown()}
+        key = report_key(values["topic"], values.get("analysts", []))
+        cached = get_report(key)
+        if cached:
+            count_report("hits")
+            finish(graph, config)
+            return {**record, "status": "done", "cached": True, "analysts": analysts,
+                    "final_report": cached, "timings": tracer.breakdown()}
+        count_report("misses")
+        graph.update_state(config, {"human_analyst_feedback": None}, as_node="human_feedback")
+        values = graph.invoke(None, run_config)
+        if values.get("final_report"):
+            put_report(key, values["final_report"])
+
+    if not values.get("final_report"):
+        raise RuntimeError("the run ended without a report")
+    finish(graph, config)
+    return {**record, "status": "done", "cached": False, "analysts": [a.name for a in values.get("analysts", [])],
+            "final_report": values["final_report"], "timings": tracer.breakdown()}
+
+def finish(graph, config):
+    if hasattr(graph.checkpointer, "mark_finished"):
+        graph.checkpointer.mark_finished(config["configurable"]["thread_id"])
+
+def run_batch(items: list, output: str, workers: int = BATCH_WORKERS) -> dict:
+    """Runs every item not yet finished in `output`; returns counts by status."""
+    finished = load_finished(output)
+    pending = [item for item in items if item["id"] not in finished]
+    counts = {"skipped": len(items) - len(pending), "done": 0, "awaiting_approval": 0, "error": 0}
+    print(f"📦 {len(pending)} topics to run ({counts['skipped']} already done), {workers} workers")
+
+    writer = OutputWriter(output)
+    started = time.perf_counter()
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch")
+    try:
+        futures = {pool.submit(run_item, item): item for item in pending}
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                record = {"id": item["id"], "topic": item["topic"], "thread_id": thread_id(item),
+                          "status": "error", "error": f"{type(e).__name__}: {e}"}
+            record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+            writer.write(record)
+            counts[record["status"]] += 1
+            completed = sum(counts[s] for s in ("done", "awaiting_approval", "error"))
+            print(f"{'✅' if record['status'] == 'done' else '⚠️'} [{completed}/{len(pending)}] "
+                  f"{record['status']}: {item['topic'][:60]}")
+    except KeyboardInterrupt:
+        # Topics already running finish (or checkpoint) on their own; queued ones resume on the next run
+        print("⏹️ Interrupted: waiting for running topics, rerun the same command to resume")
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        writer.close()
+    counts["wall_s"] = round(time.perf_counter() - started, 3)
+    return counts
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file of topics")
+    parser.add_argument("--output", default="reports.jsonl", help="JSONL file reports are appended to")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Topics researched at once")
+    parser.add_argument("--max-analysts", type=int, default=DEFAULT_ANALYSTS, help="Default when a line has no max_analysts")
+    parser.add_argument("--no-auto-approve", action="store_true", help="Default to stopping at the analyst review")
+    args = parser.parse_args(argv)
+
+    try:
+        items = load_topics(args.input, args.max_analysts, auto_approve=not args.no_auto_approve)
+    except ValueError as e:
+        parser.error(str(e))
+    counts = run_batch(items, args.output, args.workers)
+    print(f"\n📦 Batch finished in {counts['wall_s']:.1f}s: {counts['done']} done, "
+          f"{counts['awaiting_approval']} awaiting approval, {counts['error']} failed, "
+          f"{counts['skipped']} skipped -> {args.output}")
+    return 1 if counts["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from src.metrics import SEARCH_DURATION, SEARCH_REQUESTS, SEARCH_ERRORS, REPORT_REQUESTS
+
+def _default_cache_dir() -> str:
+    # Serverless filesystems (e.g. Vercel) are read-only except for the temp directory
+    if os.access(os.getcwd(), os.W_OK):
+        return ".cache"
+    return os.path.join(tempfile.gettempdir(), "research-cache")
+
+# Cache files, checkpoints and the job store live here unless overridden
+CACHE_DIR = os.getenv("CACHE_DIR") or _default_cache_dir()
+
+# --- STORAGE ---
+
+class SQLiteCache:
+    """
+    Small TTL + LRU key/value store on SQLite, shared safely by threads and processes.
+
+    Entries are grouped in namespaces; each namespace can be capped to a maximum
+    number of entries, evicting the least recently used first.
+    """
+
+    def __init__(self, path: str, max_entries: dict = None):
+        self.path = path
+        self.max_entries = max_entries or {}
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+                " expires_at REAL, accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (namespace, accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str):
+        """Returns the stored value, or None if missing or expired."""
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT value, expires_at FROM entries WHERE namespace=? AND key=?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] is not None and row[1] < now:
+            conn.execute("DELETE FROM entries WHERE namespace=? AND key=?", (namespace, key))
+            return None
+        conn.execute("UPDATE entries SET accessed_at=? WHERE namespace=? AND key=?", (now, namespace, key))
+        return json.loads(row[0])
+
+    def set(self, namespace: str, key: str, value, ttl: float = None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, json.dumps(value), now + ttl if ttl else None, now),
+        )
+        self._evict(namespace)
+
+    def delete(self, namespace: str, key: str):
+        self._conn().execute("DELETE FROM entries WHERE namespace=? AND key=?", (namespace, key))
+
+    def _evict(self, namespace: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM entries WHERE namespace=? AND expires_at < ?", (namespace, time.time()))
+        cap = self.max_entries.get(namespace)
+        if cap:
+            conn.execute(
+                "DELETE FROM entries WHERE namespace=? AND key IN ("
+                " SELECT key FROM entries WHERE namespace=? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, namespace, cap),
+            )
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key onto one execution."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Returns (result, shared) where `shared` is True if another caller did the work."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return future.result(), False
+
+
+# --- SEARCH CACHE ---
+
+class CacheMiss(LookupError):
+    """Raised in offline mode when a lookup is not in the pre-seeded store."""
+
+
+# Per-source freshness: web results go stale quickly, encyclopedia pages do not
+SEARCH_TTLS = {
+    "tavily": float(os.getenv("TAVILY_CACHE_TTL", 6 * 3600)),
+    "wikipedia": float(os.getenv("WIKIPEDIA_CACHE_TTL", 7 * 24 * 3600)),
+}
+SEARCH_MAX_ENTRIES = {
+    "tavily": int(os.getenv("TAVILY_CACHE_MAX_ENTRIES", 5000)),
+    "wikipedia": int(os.getenv("WIKIPEDIA_CACHE_MAX_ENTRIES", 2000)),
+}
+
+_search_store = None
+_store_lock = threading.Lock()
+_search_flight = SingleFlight()
+_search_stats = {}
+_stats_lock = threading.Lock()
+
+def _store() -> SQLiteCache:
+    global _search_store
+    with _store_lock:
+        if _search_store is None:
+            path = os.getenv("SEARCH_CACHE_PATH", os.path.join(CACHE_DIR, "search.sqlite"))
+            _search_store = SQLiteCache(path, max_entries=SEARCH_MAX_ENTRIES)
+        return _search_store
+
+def _count(source: str, field: str, started: float = None):
+    with _stats_lock:
+        stats = _search_stats.setdefault(source, {"hits": 0, "misses": 0, "coalesced": 0})
+        stats[field] += 1
+    status = {"hits": "hit", "misses": "miss"}.get(field, field)
+    SEARCH_REQUESTS.inc(source=source, cache=status)
+    if started is not None:
+        SEARCH_DURATION.observe(time.perf_counter() - started, source=source, cache=status)
+
+def normalize_query(query: str) -> str:
+    """Lowercases, strips punctuation and orders terms so trivially different queries share a key."""
+    terms = re.sub(r"[^\w\s]", " ", query.lower()).split()
+    return " ".join(sorted(set(terms)))
+
+def query_key(source: str, query: str) -> str:
+    return hashlib.sha256(f"{source}\x00{normalize_query(query)}".encode()).hexdigest()
+
+def cached_search(source: str, query: str, fetch):
+    """
+    Returns the cached result for `query` from `source`, calling `fetch()` on a miss.
+
+    `fetch` must return something JSON-serialisable. Concurrent misses for the same
+    key share one fetch. Set SEARCH_CACHE_OFFLINE=1 to never touch the network.
+    """
+    started = time.perf_counter()
+    store = _store()
+    key = query_key(source, query)
+
+    value = store.get(source, key)
+    if value is not None:
+        _count(source, "hits", started)
+        return value
+
+    if os.getenv("SEARCH_CACHE_OFFLINE") == "1":
+        _count(source, "misses", started)
+        raise CacheMiss(f"{source}: {query}")
+
+    def load():
+        # Re-check: another process may have filled it while we waited
+        cached = store.get(source, key)
+        if cached is not None:
+            return cached, True
+        try:
+            result = fetch()
+        except Exception:
+            SEARCH_ERRORS.inc(source=source)
+            raise
+        store.set(source, key, result, ttl=SEARCH_TTLS.get(source))
+        return result, False
+
+    (value, was_cached), shared = _search_flight.do(key, load)
+    _count(source, "coalesced" if shared else ("hits" if was_cached else "misses"), started)
+    return value
+
+def seed_search(source: str, query: str, value):
+    """Stores a result up front, e.g. to build an offline fixture store."""
+    _store().set(source, query_key(source, query), value, ttl=SEARCH_TTLS.get(source))
+
+def search_cache_stats() -> dict:
+    with _stats_lock:
+        stats = {source: dict(s) for source, s in _search_stats.items()}
+    for s in stats.values():
+        total = s["hits"] + s["misses"] + s["coalesced"]
+        s["hit_rate"] = round((s["hits"] + s["coalesced"]) / total, 3) if total else 0.0
+    return stats
+
+# --- REPORT CACHE ---
+# Finished reports keyed on the normalized topic and the approved analysts, so a
+# repeated (or concurrent, see JobFlight in src/jobs.py) run is served without
+# re-researching.
+
+REPORT_TTL = float(os.getenv("REPORT_CACHE_TTL", 24 * 3600))
+REPORT_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 500))
+# Per-analyst interviews (see INTERVIEW CACHE below) live in the same store
+INTERVIEW_CACHE = os.getenv("INTERVIEW_CACHE", "1") == "1"
+INTERVIEW_TTL = float(os.getenv("INTERVIEW_CACHE_TTL", 24 * 3600))
+INTERVIEW_MAX_ENTRIES = int(os.getenv("INTERVIEW_CACHE_MAX_ENTRIES", 5000))
+
+_report_store = None
+_report_stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+def _reports() -> SQLiteCache:
+    global _report_store
+    with _store_lock:
+        if _report_store is None:
+            path = os.getenv("REPORT_CACHE_PATH", os.path.join(CACHE_DIR, "reports.sqlite"))
+            _report_store = SQLiteCache(path, max_entries={"report": REPORT_MAX_ENTRIES, "interview": INTERVIEW_MAX_ENTRIES})
+        return _report_store
+
+def normalize_topic(topic: str) -> str:
+    """Case, punctuation and whitespace insensitive; unlike queries, word order matters."""
+    return " ".join(re.sub(r"[^\w\s]", " ", topic.lower()).split())
+
+def fingerprint(value) -> str:
+    """Stable hash of a pydantic model, dict or list of them."""
+    if isinstance(value, list):
+        # Order-insensitive: the same analysts in another order are the same team
+        return hashlib.sha256("\x00".join(sorted(fingerprint(v) for v in value)).encode()).hexdigest()
+    data = value.model_dump() if hasattr(value, "model_dump") else value
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+def report_key(topic: str, analysts: list) -> str:
+    return hashlib.sha256(f"{normalize_topic(topic)}\x00{fingerprint(analysts)}".encode()).hexdigest()
+
+def count_report(field: str):
+    with _stats_lock:
+        _report_stats[field] += 1
+    REPORT_REQUESTS.inc(cache={"hits": "hit", "misses": "miss"}.get(field, field))
+
+def get_report(key: str):
+    """Returns the cached final report for `key`, or None."""
+    return _reports().get("report", key)
+
+def put_report(key: str, final_report: str):
+    _reports().set("report", key, final_report, ttl=REPORT_TTL)
+
+def report_cache_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_report_stats)
+    total = sum(stats.values())
+    stats["hit_rate"] = round((stats["hits"] + stats["coalesced"]) / total, 3) if total else 0.0
+    stats["interviews_reused"] = _interview_stats["reused"]
+    stats["interviews_run"] = _interview_stats["run"]
+    return stats
+
+# --- INTERVIEW CACHE ---
+# One entry per (topic, analyst persona): the transcript, retrieved context and
+# written section. After feedback, or when a crashed run is resumed, only new or
+# changed analysts are interviewed again.
+
+_interview_stats = {"reused": 0, "run": 0}
+
+def interview_key(topic: str, analyst) -> str:
+    return hashlib.sha256(f"{normalize_topic(topic)}\x00{fingerprint(analyst)}".encode()).hexdigest()
+
+def get_interview(topic: str, analyst, count: bool = True):
+    """Returns {"interview", "context", "section"} for this analyst and topic, or None."""
+    if not INTERVIEW_CACHE:
+        return None
+    cached = _reports().get("interview", interview_key(topic, analyst))
+    if count:
+        with _stats_lock:
+            _interview_stats["reused" if cached else "run"] += 1
+    return cached
+
+def put_interview(topic: str, analyst, interview: str, context: list, section: str):
+    if INTERVIEW_CACHE:
+        _reports().set(
+            "interview", interview_key(topic, analyst),
+            {"interview": interview, "context": context, "section": section}, ttl=INTERVIEW_TTL,
+        )
@@ -0,0 +1,261 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from src.cache import CACHE_DIR
+from src.context import document_id, store_documents
+
+# --- CONFIGURATION ---
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")  # "sqlite" or "memory"
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", os.path.join(CACHE_DIR, "checkpoints.sqlite"))
+
+# Threads nobody touched for this long are considered abandoned
+THREAD_IDLE_TTL = float(os.getenv("THREAD_IDLE_TTL", 2 * 3600))
+# Finished threads are only kept briefly (e.g. for a late reconnect)
+THREAD_FINISHED_TTL = float(os.getenv("THREAD_FINISHED_TTL", 10 * 60))
+MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", 2000))
+MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_MB", 256)) * 1024 * 1024
+PRUNE_INTERVAL = 60
+
+# --- SERIALIZATION ---
+
+def _jsonplus(allowed_types=None) -> JsonPlusSerializer:
+    # Without an explicit allowlist keep LangGraph's default (permissive, with a warning)
+    if allowed_types:
+        return JsonPlusSerializer(allowed_msgpack_modules=allowed_types)
+    return JsonPlusSerializer()
+
+class CompressedSerializer:
+    """Msgpack serializer that zlib-compresses payloads above a small threshold."""
+
+    PREFIX = "zlib+"
+
+    def __init__(self, allowed_types=None, min_size: int = 512):
+        self.inner = _jsonplus(allowed_types)
+        self.min_size = min_size
+
+    def dumps_typed(self, obj):
+        type_, data = self.inner.dumps_typed(obj)
+        if isinstance(data, bytes) and len(data) >= self.min_size:
+            return self.PREFIX + type_, zlib.compress(data, 6)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, payload = data
+        if type_.startswith(self.PREFIX):
+            return self.inner.loads_typed((type_[len(self.PREFIX):], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+# --- MEMORY BACKEND ---
+
+class DocumentMemorySaver(MemorySaver):
+    """MemorySaver with the per-thread document store of BoundedSqliteSaver."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._documents = {}
+        self._documents_lock = threading.Lock()
+
+    def put_documents(self, thread_id: str, docs: list) -> list:
+        with self._documents_lock:
+            store = self._documents.setdefault(str(thread_id), {})
+            new, ids = store_documents(store, docs)
+            store.update(new)
+        return ids
+
+    def get_documents(self, thread_id: str, ids: list) -> dict:
+        with self._documents_lock:
+            store = self._documents.get(str(thread_id), {})
+            return {doc_id: store[doc_id] for doc_id in ids if doc_id in store}
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._documents_lock:
+            self._documents.pop(str(thread_id), None)
+
+# --- SQLITE BACKEND ---
+
+class BoundedSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that tracks thread activity and evicts old threads.
+
+    Every worker process opens its own connection to the same WAL-mode database,
+    so any process can resume any thread. Eviction runs opportunistically from
+    `put` (at most once per PRUNE_INTERVAL) and removes finished threads after
+    THREAD_FINISHED_TTL, idle ones after THREAD_IDLE_TTL, and then the least
+    recently used threads until the MAX_THREADS / MAX_BYTES caps hold.
+
+    It also holds each thread's retrieved documents, stored once per run however
+    many interviews find them; interview state keeps only their ids. Documents
+    are evicted together with their thread.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, **kwargs):
+        super().__init__(conn, **kwargs)
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS threads (
+                thread_id TEXT PRIMARY KEY,
+                updated_at REAL NOT NULL,
+                finished INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS threads_updated ON threads (updated_at);
+            CREATE TABLE IF NOT EXISTS documents (
+                thread_id TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                attr TEXT NOT NULL,
+                url TEXT NOT NULL,
+                content TEXT NOT NULL,
+                PRIMARY KEY (thread_id, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS documents_url ON documents (thread_id, url);
+            """
+        )
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        self._touch(config["configurable"]["thread_id"])
+        if time.time() - self._last_prune > PRUNE_INTERVAL:
+            self.evict()
+        return result
+
+    def _touch(self, thread_id, finished: int = 0):
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT INTO threads (thread_id, updated_at, finished) VALUES (?, ?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET updated_at=excluded.updated_at, finished=excluded.finished",
+                (str(thread_id), time.time(), finished),
+            )
+
+    def mark_finished(self, thread_id: str):
+        """Flags a thread whose run completed so it is evicted on the short TTL."""
+        self._touch(thread_id, finished=1)
+
+    def compact(self, thread_id: str):
+        """Drops every checkpoint (and its writes) except the latest one per namespace."""
+        with self.cursor() as cur:
+            cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_id NOT IN ("
+                " SELECT MAX(checkpoint_id) FROM checkpoints WHERE thread_id = ? GROUP BY checkpoint_ns)",
+                (str(thread_id), str(thread_id)),
+            )
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS ("
+                " SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id"
+                " AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id)",
+                (str(thread_id),),
+            )
+
+    def put_documents(self, thread_id: str, docs: list) -> list:
+        """
+        Adds `docs` to the thread's store, reusing the entry of a document already
+        stored under the same URL or content; returns their ids in order.
+        """
+        if not docs:
+            return []
+        thread_id = str(thread_id)
+        with self.cursor() as cur:
+            # One transaction, so interviews storing the same source at once share one entry
+            urls = [doc["url"] for doc in docs if doc["url"]]
+            doc_ids = [document_id(doc["content"]) for doc in docs]
+            rows = cur.execute(
+                f"SELECT doc_id, url FROM documents WHERE thread_id = ? AND (url IN ({','.join('?' * len(urls))}) "
+                f"OR doc_id IN ({','.join('?' * len(doc_ids))}))",
+                (thread_id, *urls, *doc_ids),
+            ).fetchall()
+            # store_documents only needs the URL and id of what is already stored
+            known = {doc_id: {"url": url} for doc_id, url in rows}
+            new, ids = store_documents(known, docs)
+            cur.executemany(
+                "INSERT OR IGNORE INTO documents (thread_id, doc_id, attr, url, content) VALUES (?, ?, ?, ?, ?)",
+                [(thread_id, doc_id, doc["attr"], doc["url"], doc["content"]) for doc_id, doc in new.items()],
+            )
+        return ids
+
+    def get_documents(self, thread_id: str, ids: list) -> dict:
+        """The stored documents among `ids`, as {id: {attr, url, content}}."""
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return {}
+        with self.cursor(transaction=False) as cur:
+            rows = cur.execute(
+                f"SELECT doc_id, attr, url, content FROM documents WHERE thread_id = ? AND doc_id IN ({','.join('?' * len(ids))})",
+                (str(thread_id), *ids),
+            ).fetchall()
+        return {doc_id: {"attr": attr, "url": url, "content": content} for doc_id, attr, url, content in rows}
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM threads WHERE thread_id = ?", (str(thread_id),))
+            cur.execute("DELETE FROM documents WHERE thread_id = ?", (str(thread_id),))
+
+    def _size_bytes(self) -> int:
+        with self.cursor(transaction=False) as cur:
+            pages = cur.execute("PRAGMA page_count").fetchone()[0]
+            free = cur.execute("PRAGMA freelist_count").fetchone()[0]
+            page_size = cur.execute("PRAGMA page_size").fetchone()[0]
+        return (pages - free) * page_size
+
+    def evict(self):
+        """Removes expired threads, then the oldest ones while over the count or size cap."""
+        if not self._prune_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_prune = time.time()
+            now = time.time()
+            with self.cursor(transaction=False) as cur:
+                expired = [row[0] for row in cur.execute(
+                    "SELECT thread_id FROM threads WHERE (finished = 1 AND updated_at < ?) OR updated_at < ?",
+                    (now - THREAD_FINISHED_TTL, now - THREAD_IDLE_TTL),
+                )]
+                excess = cur.execute("SELECT COUNT(*) FROM threads").fetchone()[0] - len(expired) - MAX_THREADS
+            for thread_id in expired:
+                self.delete_thread(thread_id)
+
+            while excess > 0 or self._size_bytes() > MAX_BYTES:
+                with self.cursor(transaction=False) as cur:
+                    oldest = [row[0] for row in cur.execute(
+                        "SELECT thread_id FROM threads ORDER BY updated_at LIMIT ?", (max(excess, 10),)
+                    )]
+                if not oldest:
+                    break
+                for thread_id in oldest:
+                    self.delete_thread(thread_id)
+                excess -= len(oldest)
+        finally:
+            self._prune_lock.release()
+
+# --- FACTORY ---
+
+def get_checkpointer(allowed_types=None):
+    """
+    Returns the configured checkpointer.
+
+    `allowed_types` lists (module, class) pairs of custom state models that may be
+    restored from msgpack, e.g. [("src.helper", "Analyst")].
+    """
+    if CHECKPOINT_BACKEND == "memory":
+        return DocumentMemorySaver(serde=_jsonplus(allowed_types))
+
+    directory = os.path.dirname(CHECKPOINT_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(CHECKPOINT_PATH, check_same_thread=False, timeout=30)
+    # Another worker process may hold the write lock briefly; wait instead of failing
+    conn.execute("PRAGMA busy_timeout=30000")
+    return BoundedSqliteSaver(conn, serde=CompressedSerializer(allowed_types))
@@ -1,7 +1,13 @@
 import os
+import threading
+from functools import wraps
 from dotenv import load_dotenv, find_dotenv
-from langchain_groq import ChatGroq
-from langchain_community.tools.tavily_search import TavilySearchResults
+
+from src.ratelimit import get_scheduler
+
+# Models and tools are created on first use and cached for the process lifetime,
+# so importing this module (e.g. on a serverless cold start) stays cheap.
+# LangChain/Groq/Tavily are only imported inside the factories below.
 
 # 1. Load Environment Variables
 found_dotenv = find_dotenv()
@@ -12,28 +18,157 @@ else:
     pass
 
 # 2. Validation
-if not os.getenv("GROQ_API_KEY"):
-    raise ValueError("GROQ_API_KEY is missing. Please set it in your .env file.")
-if not os.getenv("TAVILY_API_KEY"):
-    raise ValueError("TAVILY_API_KEY is missing. Please set it in your .env file.")
+# Checked when the client that needs the key is first created.
+def _require(name: str):
+    if not os.getenv(name):
+        raise ValueError(f"{name} is missing. Please set it in your .env file.")
+
+def _split(value: str) -> list:
+    return [v.strip() for v in (value or "").split(",") if v.strip()]
+
+# 3. Models & Rate Limits
+# Each role is a pool of (API key x model) members. GROQ_API_KEYS / *_MODELS take
+# comma-separated lists; every member gets its own scheduler, because Groq limits
+# apply per key and model, so throughput grows with the number of keys.
+# Defaults follow Groq's free tier; override them for paid keys.
+PLANNER_MODEL = "llama-3.3-70b-versatile"
+WORKER_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
+WORKER_FALLBACK_MODEL = "llama-3.1-8b-instant"
+
+PLANNER_MODELS = _split(os.getenv("PLANNER_MODELS", PLANNER_MODEL))
+WORKER_MODELS = _split(os.getenv("WORKER_MODELS", WORKER_MODEL))
+# Used by the worker only when every primary member is throttled or failing ("" disables)
+WORKER_FALLBACK_MODELS = _split(os.getenv("WORKER_FALLBACK_MODELS", WORKER_FALLBACK_MODEL))
+
+# role -> default (rpm, tpm, max_concurrency) per member, overridable as <ROLE>_RPM etc.
+RATE_LIMITS = {
+    "PLANNER": (30, 12000, 4),
+    "WORKER": (30, 30000, 8),
+    "WORKER_FALLBACK": (30, 6000, 4),
+}
+
+def _limits(role: str) -> dict:
+    rpm, tpm, max_concurrency = RATE_LIMITS[role]
+    return {
+        "rpm": float(os.getenv(f"{role}_RPM", rpm)),
+        "tpm": float(os.getenv(f"{role}_TPM", tpm)),
+        "max_concurrency": int(os.getenv(f"{role}_MAX_CONCURRENCY", max_concurrency)),
+    }
+
+def _api_keys() -> list:
+    keys = _split(os.getenv("GROQ_API_KEYS")) or _split(os.getenv("GROQ_API_KEY"))
+    if not keys:
+        _require("GROQ_API_KEY")
+    return keys
+
+# --- LAZY INSTANCES ---
+
+_instances = {}
+_getters = {}
+_lock = threading.RLock()  # re-entrant: llm_worker is built from worker_model
+
+def _lazy(name: str):
+    """Caches the decorated factory's result under `name` (see `override`)."""
+    def decorator(factory):
+        @wraps(factory)
+        def getter():
+            with _lock:
+                if name not in _instances:
+                    _instances[name] = factory()
+                return _instances[name]
+        _getters[name] = getter
+        return getter
+    return decorator
+
+def override(**instances):
+    """Replaces models/tools before (or after) first use, e.g. with offline fakes."""
+    unknown = set(instances) - set(_getters)
+    if unknown:
+        raise AttributeError(f"Unknown config instances: {sorted(unknown)}")
+    with _lock:
+        # Derived instances are rebuilt from the overridden ones on next use
+        if "worker_model" in instances and "llm_worker" not in instances:
+            _instances.pop("llm_worker", None)
+        _instances.update(instances)
+
+# 4. Initialize Models
+# All Groq clients share one HTTP connection pool.
+@_lazy("http_client")
+def get_http_client():
+    import httpx
+
+    connections = int(os.getenv("LLM_MAX_CONNECTIONS", 64))
+    return httpx.Client(limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections))
+
+def _members(models: list, role: str) -> list:
+    from langchain_groq import ChatGroq
+    from src.llm import ScheduledChatModel
+
+    keys = _api_keys()
+    members = []
+    for model in models:
+        for i, key in enumerate(keys):
+            name = model if len(keys) == 1 else f"{model}#{i + 1}"
+            # Client-side retries are disabled so 429s reach the scheduler (which throttles
+            # every caller of that key) and the pool (which moves the call to another member)
+            members.append(ScheduledChatModel(
+                inner=ChatGroq(model=model, api_key=key, temperature=0, max_retries=0, http_client=get_http_client()),
+                scheduler=get_scheduler(name, **_limits(role)),
+                max_throttle_retries=0,
+            ))
+    return members
 
-# 3. Initialize Models
 # The Planner: Smart, Structured (Llama 3.3 70B)
-llm_planner = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    temperature=0
-)
-
-# The Worker: Fast, High Rate Limit (Llama 4 17B)
-# Includes Auto-Retry for Rate Limits
-llm_worker = ChatGroq(
-    model="meta-llama/llama-4-scout-17b-16e-instruct",
-    temperature=0
-).with_retry(
-    stop_after_attempt=8,
-    wait_exponential_jitter=True 
-)
-
-# 4. Initialize Tools
+@_lazy("llm_planner")
+def get_llm_planner():
+    from src.llm import PooledChatModel
+
+    return PooledChatModel(members=_members(PLANNER_MODELS, "PLANNER"))
+
+# The Worker: Fast, High Rate Limit (Llama 4 17B), failing over to a smaller model
+@_lazy("worker_model")
+def get_worker_model():
+    from src.llm import PooledChatModel
+
+    return PooledChatModel(
+        members=_members(WORKER_MODELS, "WORKER"),
+        fallbacks=_members(WORKER_FALLBACK_MODELS, "WORKER_FALLBACK"),
+    )
+
+# Includes Auto-Retry for transient (non rate limit) failures
+@_lazy("llm_worker")
+def get_llm_worker():
+    return get_worker_model().with_retry(
+        stop_after_attempt=8,
+        wait_exponential_jitter=True
+    )
+
+# 5. Initialize Tools
 # Max results set to 3 for better data coverage
-tavily_search = TavilySearchResults(max_results=3)
\ No newline at end of file
+@_lazy("tavily_search")
+def get_tavily_search():
+    from langchain_community.tools.tavily_search import TavilySearchResults
+
+    _require("TAVILY_API_KEY")
+    return TavilySearchResults(max_results=3)
+
+# 6. Research Defaults
+# Report synthesis condenses sections hierarchically, so large teams stay within context limits
+DEFAULT_ANALYSTS = 3
+MAX_ANALYSTS_LIMIT = int(os.getenv("MAX_ANALYSTS_LIMIT", 50))
+
+def parse_max_analysts(value) -> int:
+    """Clamps a requested analyst count to 1..MAX_ANALYSTS_LIMIT; empty means DEFAULT_ANALYSTS."""
+    if value is None or str(value).strip() == "":
+        return DEFAULT_ANALYSTS
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_analysts must be a whole number, got {value!r}")
+    return max(1, min(MAX_ANALYSTS_LIMIT, count))
+
+def __getattr__(name):
+    # Backwards compatible `from src.config import llm_planner` etc., created on access
+    if name in _getters:
+        return _getters[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
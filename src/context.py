@@ -0,0 +1,243 @@
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+
+from src.metrics import CONTEXT_TOKENS
+
+# --- CONFIGURATION ---
+# Budgets are in (estimated) tokens; ~4 characters per token
+ANSWER_TOKEN_BUDGET = int(os.getenv("ANSWER_TOKEN_BUDGET", 3000))
+SECTION_TOKEN_BUDGET = int(os.getenv("SECTION_TOKEN_BUDGET", 4000))
+# Report synthesis: memos handed to the report writer, and the digest for intro/conclusion
+REPORT_TOKEN_BUDGET = int(os.getenv("REPORT_TOKEN_BUDGET", 6000))
+# A written section is ~600 tokens with its source list, so teams of up to six need no condensing
+DIGEST_TOKEN_BUDGET = int(os.getenv("DIGEST_TOKEN_BUDGET", 4000))
+CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", 200))
+# Documents whose chunks and term counts are kept in memory for reuse across interviews
+DOCUMENT_CACHE_SIZE = int(os.getenv("DOCUMENT_CACHE_SIZE", 4096))
+
+DOCUMENT_PATTERN = re.compile(r'<Document (href|source)="(.*?)"/>\n(.*?)\n</Document>', re.S)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+_stats = {"calls": 0, "documents_in": 0, "duplicates_dropped": 0, "documents_extracted": 0, "tokens_in": 0, "tokens_out": 0}
+_stats_lock = threading.Lock()
+
+# --- PARSING ---
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+def parse_documents(context: list) -> list:
+    """Splits the formatted search results in `context` back into {attr, url, content} dicts."""
+    docs = []
+    for block in context:
+        for attr, url, content in DOCUMENT_PATTERN.findall(str(block)):
+            docs.append({"attr": attr, "url": url, "content": content.strip()})
+    return docs
+
+def content_hash(text: str) -> str:
+    normalized = " ".join(text.lower().split())
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+def dedupe_documents(docs: list) -> list:
+    """Drops documents already seen by URL or by (whitespace/case-insensitive) content."""
+    seen_urls, seen_hashes, unique = set(), set(), []
+    for doc in docs:
+        digest = content_hash(doc["content"])
+        url = doc["url"]
+        if digest in seen_hashes or (url and url in seen_urls):
+            continue
+        seen_hashes.add(digest)
+        if url:
+            seen_urls.add(url)
+        unique.append(doc)
+    return unique
+
+def chunk_document(doc: dict, chunk_tokens: int = CHUNK_TOKENS) -> list:
+    """Splits a document on paragraph boundaries into chunks of roughly `chunk_tokens`."""
+    limit = chunk_tokens * 4
+    chunks, current = [], ""
+    for paragraph in re.split(r"\n\s*\n", doc["content"]):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        # Very long paragraphs are cut on sentence boundaries
+        pieces = [paragraph] if len(paragraph) <= limit else re.split(r"(?<=[.!?])\s+", paragraph)
+        for piece in pieces:
+            if current and len(current) + len(piece) > limit:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return [{"doc": doc, "position": i, "text": text} for i, text in enumerate(chunks)]
+
+def novelty(previous: list, current: list, documents: dict = None) -> dict:
+    """How much of the documents in `current` is new relative to `previous`, by URL and content hash."""
+    seen_urls, seen_hashes = set(), set()
+    for doc in resolve_documents(previous, documents):
+        seen_hashes.add(content_hash(doc["content"]))
+        if doc["url"]:
+            seen_urls.add(doc["url"])
+    docs = dedupe_documents(resolve_documents(current, documents))
+    new = [d for d in docs if content_hash(d["content"]) not in seen_hashes and not (d["url"] and d["url"] in seen_urls)]
+    return {
+        "docs": len(docs),
+        "new_docs": len(new),
+        "new_urls": len({d["url"] for d in new if d["url"]}),
+        "new_chars": sum(len(d["content"]) for d in new),
+    }
+
+# --- DOCUMENT STORE ---
+# A run's documents live once in graph state as {id: {attr, url, content}}; interview
+# contexts hold ids into it. Ids are content hashes, so they are stable across
+# analysts, processes and runs.
+
+def document_id(content: str) -> str:
+    return content_hash(content)[:16]
+
+def is_document_id(entry) -> bool:
+    return isinstance(entry, str) and len(entry) == 16 and all(c in "0123456789abcdef" for c in entry)
+
+def store_documents(store: dict, docs: list) -> tuple:
+    """
+    Registers `docs` against `store`, reusing the entry of a document already
+    stored under the same URL or content. Returns (new entries, ids of `docs`).
+    """
+    store = store or {}
+    by_url = {doc["url"]: doc_id for doc_id, doc in store.items() if doc["url"]}
+    new, ids = {}, []
+    for doc in docs:
+        doc_id = by_url.get(doc["url"]) if doc["url"] else None
+        if doc_id is None:
+            doc_id = document_id(doc["content"])
+            if doc_id not in store and doc_id not in new:
+                new[doc_id] = {"attr": doc.get("attr", "href"), "url": doc["url"], "content": doc["content"]}
+                if doc["url"]:
+                    by_url[doc["url"]] = doc_id
+        if doc_id not in ids:
+            ids.append(doc_id)
+    return new, ids
+
+def resolve_documents(context: list, documents: dict = None) -> list:
+    """The documents `context` refers to: ids into `documents`, or <Document> text (older checkpoints, memoized interviews)."""
+    documents = documents or {}
+    docs = []
+    for entry in context:
+        if isinstance(entry, str) and entry in documents:
+            docs.append(documents[entry])
+        else:
+            docs.extend(parse_documents([entry]))
+    return docs
+
+def render_documents(docs: list) -> str:
+    return "\n\n---\n\n".join(f'<Document {d["attr"]}="{d["url"]}"/>\n{d["content"]}\n</Document>' for d in docs)
+
+@lru_cache(maxsize=DOCUMENT_CACHE_SIZE)
+def _extract(content: str) -> tuple:
+    """Chunk texts and their term counts; computed once per document, shared by every section writer."""
+    with _stats_lock:
+        _stats["documents_extracted"] += 1
+    texts = [chunk["text"] for chunk in chunk_document({"content": content})]
+    return tuple(texts), tuple(Counter(TOKEN_PATTERN.findall(t.lower())) for t in texts)
+
+# --- RANKING ---
+
+class BM25:
+    """Minimal Okapi BM25 over an in-memory list of texts."""
+
+    def __init__(self, texts: list, k1: float = 1.5, b: float = 0.75, counts: list = None):
+        self.k1, self.b = k1, b
+        self.docs = counts if counts is not None else [Counter(TOKEN_PATTERN.findall(t.lower())) for t in texts]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+        df = Counter(term for d in self.docs for term in d)
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query: str) -> list:
+        terms = set(TOKEN_PATTERN.findall(query.lower()))
+        results = []
+        for doc, length in zip(self.docs, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avg_length or 1))
+            for term in terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+# --- PACKING ---
+
+def format_documents(chunks: list) -> str:
+    """Re-emits selected chunks in the <Document> format, grouped per source in original order."""
+    grouped = {}
+    for chunk in sorted(chunks, key=lambda c: c["position"]):
+        grouped.setdefault(id(chunk["doc"]), (chunk["doc"], []))[1].append(chunk["text"])
+    return "\n\n---\n\n".join(
+        f'<Document {doc["attr"]}="{doc["url"]}"/>\n' + "\n\n".join(texts) + "\n</Document>"
+        for doc, texts in grouped.values()
+    )
+
+def pack_context(context: list, query: str, budget: int, documents: dict = None) -> tuple:
+    """
+    Deduplicates the documents in `context`, ranks their chunks against `query`
+    with BM25 and packs the best ones into `budget` tokens. Returns the packed
+    text and the URLs of the documents that made it in.
+    """
+    documents = documents or {}
+    docs = resolve_documents(context, documents)
+    # What the prompt would hold unpacked: stored documents plus any plain-text entries
+    # (legacy <Document> text, "No results" notes), which are kept as they are
+    stored = [documents[c] for c in context if isinstance(c, str) and c in documents]
+    texts = [str(c) for c in context if not (isinstance(c, str) and c in documents)]
+    raw = "\n\n---\n\n".join(filter(None, [render_documents(stored)] + texts))
+    unique = dedupe_documents(docs)
+
+    chunks, counts = [], []
+    for doc in unique:
+        chunk_texts, chunk_counts = _extract(doc["content"])
+        chunks.extend({"doc": doc, "position": i, "text": text} for i, text in enumerate(chunk_texts))
+        counts.extend(chunk_counts)
+
+    selected, used = [], 0
+    if chunks:
+        scores = BM25([c["text"] for c in chunks], counts=counts).scores(query)
+        # Ties keep retrieval order so the leading part of each document wins
+        for score, _, chunk in sorted(zip(scores, range(len(chunks)), chunks), key=lambda x: (-x[0], x[1])):
+            cost = estimate_tokens(chunk["text"])
+            if used + cost > budget:
+                continue
+            selected.append(chunk)
+            used += cost
+
+    packed = format_documents(selected) if selected else raw[: budget * 4]
+    urls = list(dict.fromkeys(c["doc"]["url"] for c in selected if c["doc"]["attr"] == "href" and c["doc"]["url"]))
+
+    tokens_in, tokens_out = estimate_tokens(raw), estimate_tokens(packed)
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["documents_in"] += len(docs)
+        _stats["duplicates_dropped"] += len(docs) - len(unique)
+        _stats["tokens_in"] += tokens_in
+        _stats["tokens_out"] += tokens_out
+    CONTEXT_TOKENS.inc(tokens_in, stage="raw")
+    CONTEXT_TOKENS.inc(tokens_out, stage="packed")
+    print(f"    (Context: {len(unique)}/{len(docs)} docs, {tokens_in} -> {tokens_out} tokens)")
+    return packed, urls
+
+def compact_context(context: list, query: str, budget: int, documents: dict = None) -> str:
+    return pack_context(context, query, budget, documents)[0]
+
+def context_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["extraction_cache_hits"] = _extract.cache_info().hits
+    stats["tokens_saved"] = stats["tokens_in"] - stats["tokens_out"]
+    stats["avg_tokens_saved_per_call"] = round(stats["tokens_saved"] / stats["calls"], 1) if stats["calls"] else 0.0
+    return stats
@@ -1,7 +1,8 @@
-import time
-import random
+import os
 import re
 import operator
+import threading
+from functools import lru_cache
 from typing import List, Annotated
 from typing_extensions import TypedDict
 from pydantic import BaseModel, Field
@@ -9,19 +10,32 @@ from pydantic import BaseModel, Field
 # LangChain / LangGraph Imports
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, get_buffer_string
 from langchain_community.document_loaders import WikipediaLoader
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import START, END, StateGraph, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.types import Send 
 
 # Internal Imports (Using relative imports for package compatibility)
-from src.config import llm_planner, llm_worker, tavily_search
+from src.config import get_llm_planner, get_llm_worker, get_worker_model, get_tavily_search
+from src.cache import cached_search, get_interview, put_interview
+from src.local_index import search_local as query_local_index, start_refresh as start_local_index
+from src.checkpoint import get_checkpointer
+from src.prefetch import get_prefetched, adopted
+from src.metrics import INTERVIEW_STOPS, INTERVIEW_TURNS
+from src.context import (
+    compact_context, pack_context, estimate_tokens, novelty,
+    is_document_id, resolve_documents, dedupe_documents, render_documents,
+    ANSWER_TOKEN_BUDGET, SECTION_TOKEN_BUDGET, REPORT_TOKEN_BUDGET, DIGEST_TOKEN_BUDGET
+)
 from src.prompt import (
     analyst_instructions, 
+    current_analysts_instructions,
     question_instructions, 
+    query_planner_instructions,
     answer_instructions, 
     section_writer_instructions, 
     report_writer_instructions, 
-    intro_conclusion_instructions
+    intro_conclusion_instructions,
+    condense_instructions
 )
 
 # --- DATA MODELS ---
@@ -38,6 +52,11 @@ class Analyst(BaseModel):
 class Perspectives(BaseModel):
     analysts: List[Analyst] = Field(description="Comprehensive list of analysts.")
 
+class SearchQueries(BaseModel):
+    web_query: str = Field(description="Concise web search query.")
+    wikipedia_term: str = Field(description="Concise Wikipedia search term.")
+    extra_queries: List[str] = Field(default_factory=list, description="Optional additional web queries.")
+
 class GenerateAnalystsState(TypedDict):
     topic: str
     max_analysts: int
@@ -45,18 +64,30 @@ class GenerateAnalystsState(TypedDict):
     analysts: List[Analyst]
 
 class InterviewState(MessagesState):
+    topic: str
     max_num_turns: int
+    # Ids into the run's shared document store (see store_run_documents), in retrieval order
     context: Annotated[list, operator.add]
+    context_seen: int
+    turn_stats: Annotated[list, operator.add]
+    stop_reason: str
     analyst: Analyst
+    search_queries: SearchQueries
     interview: str
     sections: list
 
+class InterviewOutputState(TypedDict):
+    # Only the section flows back; documents stay in the run's document store
+    sections: list
+
 class ResearchGraphState(TypedDict):
     topic: str 
     max_analysts: int 
     human_analyst_feedback: str 
     analysts: List[Analyst] 
     sections: Annotated[list, operator.add] 
+    memos: list
+    digest: str
     introduction: str 
     content: str 
     conclusion: str 
@@ -64,6 +95,33 @@ class ResearchGraphState(TypedDict):
 
 # --- NODE FUNCTIONS ---
 
+# Web queries issued per interview turn (1 = only the primary query)
+MAX_SEARCH_QUERIES = int(os.getenv("MAX_SEARCH_QUERIES", 1))
+# Adaptive interview length: novelty is measured against the interview's earlier turns,
+# so the first turn is always new. From MIN_INTERVIEW_TURNS on, an interview ends early
+# once a turn finds little new material; past the planned length it gets extra turns,
+# up to the cap, only while turns are still mostly new
+PLANNED_INTERVIEW_TURNS = int(os.getenv("PLANNED_INTERVIEW_TURNS", 3))
+MIN_INTERVIEW_TURNS = int(os.getenv("MIN_INTERVIEW_TURNS", 2))
+MAX_INTERVIEW_TURNS = int(os.getenv("MAX_INTERVIEW_TURNS", 4))
+# Share of a turn's documents that must be new to keep going / to earn an extra turn
+MIN_NOVELTY = float(os.getenv("MIN_NOVELTY", 0.3))
+EXTRA_TURN_NOVELTY = float(os.getenv("EXTRA_TURN_NOVELTY", 0.6))
+MIN_NEW_CHARS = int(os.getenv("MIN_NEW_CHARS", 500))
+
+_interview_stats = {"stop_reasons": {}, "interviews": 0, "turns": 0, "max_turns": 0}
+_interview_stats_lock = threading.Lock()
+
+# Sections merged per LLM call when condensing many analysts' work
+SYNTHESIS_BATCH_SIZE = max(2, int(os.getenv("SYNTHESIS_BATCH_SIZE", 5)))
+
+def get_query_planner():
+    """ One structured call plans both searches; retried like llm_worker """
+    return get_worker_model().with_structured_output(SearchQueries).with_retry(
+        stop_after_attempt=8,
+        wait_exponential_jitter=True
+    )
+
 def create_analysts(state: GenerateAnalystsState):
     topic = state['topic']
     max_analysts = state['max_analysts']
@@ -75,12 +133,20 @@ def create_analysts(state: GenerateAnalystsState):
     if feedback:
         print(f"🔄 Regenerating analysts with feedback: {feedback}")
 
-    structured_llm = llm_planner.with_structured_output(Perspectives)
+    structured_llm = get_llm_planner().with_structured_output(Perspectives)
     
+    # When revising, show the current set so unchanged analysts keep their interviews
+    current = ""
+    if feedback and state.get('analysts'):
+        current = current_analysts_instructions.format(
+            analysts="\n".join(a.model_dump_json() for a in state['analysts'])
+        )
+
     system_msg = analyst_instructions.format(
         topic=topic, 
         human_analyst_feedback=feedback, 
-        max_analysts=max_analysts
+        max_analysts=max_analysts,
+        current_analysts=current
     )
     
     analysts = structured_llm.invoke([SystemMessage(content=system_msg)]+[HumanMessage(content="Generate the set of analysts.")])
@@ -92,104 +158,215 @@ def create_analysts(state: GenerateAnalystsState):
         "human_analyst_feedback": None # Reset feedback after using it
     }
 
+def opening_message(topic: str) -> HumanMessage:
+    return HumanMessage(content=f"So you said you were writing an article on {topic}?")
+
 def generate_question(state: InterviewState):
-    # Staggering to prevent API limit hits
-    time.sleep(random.uniform(2, 4))
-    
     analyst = state["analyst"]
     messages = state["messages"]
+    # First turn: adopt the question prefetched while the user reviewed the analysts
+    if len(messages) == 1 and state.get("topic"):
+        prefetched = get_prefetched(state["topic"], analyst)
+        if prefetched:
+            adopted()
+            return {"messages": [AIMessage(content=prefetched["question"])]}
     system_msg = question_instructions.format(goals=analyst.persona)
-    question = llm_worker.invoke([SystemMessage(content=system_msg)]+messages)
+    question = get_llm_worker().invoke([SystemMessage(content=system_msg)]+messages)
     return {"messages": [question]}
 
-def search_web(state: InterviewState):
-    """ Search using Direct Prompting """
-    messages = state['messages']
-    prompt = SystemMessage(content="Generate a concise web search query. Return ONLY the query string.")
-    response = llm_worker.invoke(messages + [prompt])
-    search_query = response.content.strip('"').strip()
-    
-    try:
-        results = tavily_search.invoke({"query": search_query})
-        data = results if isinstance(results, list) else [results]
-        formatted = "\n\n---\n\n".join(
-            [f'<Document href="{doc.get("url", "")}"/>\n{doc.get("content", "")}\n</Document>' for doc in data]
-        )
-    except:
-        formatted = f"Search failed for: {search_query}"
-    return {"context": [formatted]}
+def fetch_tavily(query: str) -> list:
+    results = get_tavily_search().invoke({"query": query})
+    # The tool returns API errors as a string instead of raising; raise so they are never cached
+    if not isinstance(results, list) or not all(isinstance(r, dict) for r in results):
+        raise RuntimeError(f"Tavily search failed: {str(results)[:200]}")
+    return results
 
-def search_wikipedia(state: InterviewState):
+def fetch_wikipedia(query: str) -> list:
+    docs = WikipediaLoader(query=query, load_max_docs=3).load()
+    return [{"source": d.metadata.get("source", "Wiki"), "page_content": d.page_content} for d in docs]
+
+def plan_queries(state: InterviewState):
+    """ Plans the web and Wikipedia searches for this turn in a single LLM call """
     messages = state['messages']
-    prompt = SystemMessage(content="Generate a concise Wikipedia search term. Return ONLY the term.")
-    response = llm_worker.invoke(messages + [prompt])
-    search_query = response.content.strip('"').strip()
+    if len(messages) == 2 and state.get("topic"):
+        prefetched = get_prefetched(state["topic"], state["analyst"])
+        # Only valid for the very question it was planned for
+        if prefetched and prefetched["question"] == messages[-1].content:
+            return {"search_queries": SearchQueries(**prefetched["search_queries"])}
+    system_msg = query_planner_instructions.format(max_extra_queries=MAX_SEARCH_QUERIES - 1)
+    try:
+        queries = get_query_planner().invoke([SystemMessage(content=system_msg)] + messages)
+    except Exception as e:
+        # Fall back to searching for the question itself rather than failing the interview
+        print(f"    (Query planning failed: {e})")
+        question = messages[-1].content[:200]
+        queries = SearchQueries(web_query=question, wikipedia_term=question)
+    return {"search_queries": queries}
+
+# --- SHARED DOCUMENT STORE ---
+# Interviews run as parallel Send branches that cannot see each other's state, so the
+# documents they retrieve live in the checkpointer, keyed by the run's thread_id. Every
+# interview of a run shares one copy of each source; checkpoints only carry the ids.
+
+def _thread_id(config):
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+def store_run_documents(config: RunnableConfig, docs: list) -> list:
+    """ Stores `docs` for the run; returns the context entries that refer to them """
+    thread_id = _thread_id(config)
+    if thread_id is None:
+        # Outside a run (e.g. prefetch warming the caches) there is no store to refer to
+        return [render_documents(dedupe_documents(docs))] if docs else []
+    return get_graph().checkpointer.put_documents(thread_id, docs)
+
+def load_run_documents(config: RunnableConfig, context: list) -> dict:
+    """ The run's stored documents that `context` refers to, by id """
+    thread_id = _thread_id(config)
+    ids = [entry for entry in context if is_document_id(entry)]
+    if thread_id is None or not ids:
+        return {}
+    return get_graph().checkpointer.get_documents(thread_id, ids)
+
+def search_web(state: InterviewState, config: RunnableConfig = None):
+    queries = state['search_queries']
+    search_queries = [queries.web_query] + queries.extra_queries[:MAX_SEARCH_QUERIES - 1]
+
+    docs, failures = [], []
+    for search_query in search_queries:
+        search_query = search_query.strip('"').strip()
+        try:
+            data = cached_search("tavily", search_query, lambda: fetch_tavily(search_query))
+            docs.extend({"attr": "href", "url": doc.get("url", ""), "content": doc.get("content", "")} for doc in data)
+        except:
+            failures.append(f"Search failed for: {search_query}")
+    return {"context": store_run_documents(config, docs) + failures}
+
+def search_wikipedia(state: InterviewState, config: RunnableConfig = None):
+    search_query = state['search_queries'].wikipedia_term.strip('"').strip()
     
     try:
-        docs = WikipediaLoader(query=search_query, load_max_docs=3).load()
-        formatted = "\n\n---\n\n".join(
-            [f'<Document source="{d.metadata.get("source", "Wiki")}"/>\n{d.page_content}\n</Document>' for d in docs]
-        )
+        docs = cached_search("wikipedia", search_query, lambda: fetch_wikipedia(search_query))
     except:
-        formatted = "No wikipedia results."
-    return {"context": [formatted]}
+        return {"context": ["No wikipedia results."]}
+    return {"context": store_run_documents(config, [
+        {"attr": "source", "url": d["source"], "content": d["page_content"]} for d in docs
+    ])}
+
+def search_local(state: InterviewState, config: RunnableConfig = None):
+    """ Searches the local document index (LOCAL_DOCS_DIR); adds nothing when it is not configured """
+    queries = state['search_queries']
+    try:
+        docs = query_local_index(queries.web_query.strip('"').strip())
+    except Exception as e:
+        print(f"    (Local search failed: {e})")
+        docs = []
+    return {"context": store_run_documents(config, [{"attr": "href", **d} for d in docs])}
 
-def generate_answer(state: InterviewState):
+def generate_answer(state: InterviewState, config: RunnableConfig = None):
     analyst = state["analyst"]
     messages = state["messages"]
-    context = state["context"]
+    # Only the passages most relevant to the latest question, within the token budget
+    documents = load_run_documents(config, state["context"])
+    context = compact_context(state["context"], query=messages[-1].content, budget=ANSWER_TOKEN_BUDGET, documents=documents)
     system_msg = answer_instructions.format(goals=analyst.persona, context=context)
-    answer = llm_worker.invoke([SystemMessage(content=system_msg)]+messages)
+    answer = get_llm_worker().invoke([SystemMessage(content=system_msg)]+messages)
     answer.name = "expert"
-    return {"messages": [answer]}
 
-def save_interview(state: InterviewState):
-    return {"interview": get_buffer_string(state["messages"])}
-
-def write_section(state: InterviewState):
-    # Heavier staggering for the summarization task
-    delay = random.uniform(5, 10)
-    print(f"    (Summarizing... Staggering {delay:.1f}s)")
-    time.sleep(delay)
+    # What this turn's searches added on top of earlier turns
+    seen = state.get("context_seen", 0)
+    stats = novelty(state["context"][:seen], state["context"][seen:], documents)
+    stats["turn"] = len(state.get("turn_stats") or []) + 1
+    return {"messages": [answer], "turn_stats": [stats], "context_seen": len(state["context"])}
 
+def save_interview(state: InterviewState):
+    reason = stop_reason(state) or "max_turns"
+    turns = len(state.get("turn_stats") or [])
+    INTERVIEW_STOPS.inc(reason=reason)
+    INTERVIEW_TURNS.observe(turns, reason=reason)
+    with _interview_stats_lock:
+        _interview_stats["stop_reasons"][reason] = _interview_stats["stop_reasons"].get(reason, 0) + 1
+        _interview_stats["interviews"] += 1
+        _interview_stats["turns"] += turns
+        _interview_stats["max_turns"] = max(_interview_stats["max_turns"], turns)
+    print(f"    (Interview with {state['analyst'].name} ended after {turns} turns: {reason})")
+    return {"interview": get_buffer_string(state["messages"]), "stop_reason": reason}
+
+def write_section(state: InterviewState, config: RunnableConfig = None):
+    # Pacing against Groq limits is handled by the shared scheduler in src/config.py
     analyst = state["analyst"]
-    context = state["context"]
+    documents = load_run_documents(config, state["context"])
+    # The URLs come from the stored documents that made it into the prompt
+    context, urls = pack_context(state["context"], query=analyst.description, budget=SECTION_TOKEN_BUDGET, documents=documents)
     
     system_msg = section_writer_instructions.format(focus=analyst.description)
-    section = llm_worker.invoke([SystemMessage(content=system_msg)]+[HumanMessage(content=f"Use this source: {context}")])
+    section = get_llm_worker().invoke([SystemMessage(content=system_msg)]+[HumanMessage(content=f"Use this source: {context}")])
     
-    # URL Extraction
-    urls = re.findall(r'href="(.*?)"', str(context))
     section_content = section.content
     if urls:
         section_content += "\n\n### Raw Sources\n"
-        for url in set(urls):
+        for url in urls:
             section_content += f"- {url}\n"
-            
+
+    # Memoize per analyst so re-runs after feedback (or a crash) skip this interview;
+    # the entry carries the documents themselves, not ids into this run's store
+    if state.get("topic"):
+        retrieved = render_documents(dedupe_documents(resolve_documents(state["context"], documents)))
+        put_interview(state["topic"], analyst, state.get("interview", ""), [retrieved], section_content)
     return {"sections": [section_content]}
 
-def write_report(state: ResearchGraphState):
+def reuse_interview(state):
+    """ Splices in the section of an interview memoized by an earlier run """
+    print(f"♻️ Reusing interview with {state['analyst'].name}")
+    return {"sections": [state["section"]]}
+
+def condense_batches(topic: str, memos: list) -> list:
+    """ One tree level: merges each batch of memos in parallel; a lone leftover passes through """
+    batches = [memos[i:i + SYNTHESIS_BATCH_SIZE] for i in range(0, len(memos), SYNTHESIS_BATCH_SIZE)]
+    prompts = [
+        [HumanMessage(content=condense_instructions.format(topic=topic, max_words=300, memos="\n\n---\n\n".join(batch)))]
+        for batch in batches if len(batch) > 1
+    ]
+    merged = iter(get_llm_worker().batch(prompts))
+    return [batch[0] if len(batch) == 1 else next(merged).content for batch in batches]
+
+def condense_sections(state: ResearchGraphState):
+    """ Map-reduce synthesis: condenses sections in batches, level by level, down to one digest """
+    topic = state["topic"]
     sections = state["sections"]
+    levels = [sections]
+    while len(levels[-1]) > 1 and estimate_tokens("\n\n".join(levels[-1])) > DIGEST_TOKEN_BUDGET:
+        levels.append(condense_batches(topic, levels[-1]))
+
+    # The report writer gets the most detailed level that fits its budget
+    memos = next((level for level in levels if estimate_tokens("\n\n".join(level)) <= REPORT_TOKEN_BUDGET), levels[-1])
+    if memos is not sections:
+        # Condensed memos may drop URLs; keep every source citable
+        urls = dict.fromkeys(url for s in sections for url in re.findall(r"^- (\S+://\S+)$", s, re.M))
+        if urls:
+            memos = memos + ["### Raw Sources\n" + "\n".join(f"- {url}" for url in urls)]
+        print(f"🧩 Condensed {len(sections)} sections into {len(memos)} memos ({len(levels) - 1} levels)")
+    return {"memos": memos, "digest": "\n\n".join(levels[-1])}
+
+def write_report(state: ResearchGraphState):
+    memos = state["memos"]
     topic = state["topic"]
-    formatted_sections = "\n\n".join([f"{s}" for s in sections])
+    formatted_sections = "\n\n".join([f"{s}" for s in memos])
     system_msg = report_writer_instructions.format(topic=topic, context=formatted_sections)
-    report = llm_planner.invoke([SystemMessage(content=system_msg)]+[HumanMessage(content="Write report.")])
+    report = get_llm_planner().invoke([SystemMessage(content=system_msg)]+[HumanMessage(content="Write report.")])
     return {"content": report.content}
 
 def write_introduction(state: ResearchGraphState):
-    sections = state["sections"]
     topic = state["topic"]
-    formatted_sections = "\n\n".join([f"{s}" for s in sections])
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_sections)
-    intro = llm_planner.invoke([instructions]+[HumanMessage(content="Write introduction.")])
+    # The condensed digest, not every raw section
+    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=state["digest"])
+    intro = get_llm_planner().invoke([instructions]+[HumanMessage(content="Write introduction.")])
     return {"introduction": intro.content}
 
 def write_conclusion(state: ResearchGraphState):
-    sections = state["sections"]
     topic = state["topic"]
-    formatted_sections = "\n\n".join([f"{s}" for s in sections])
-    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=formatted_sections)
-    conclusion = llm_planner.invoke([instructions]+[HumanMessage(content="Write conclusion.")])
+    # The condensed digest, not every raw section
+    instructions = intro_conclusion_instructions.format(topic=topic, formatted_str_sections=state["digest"])
+    conclusion = get_llm_planner().invoke([instructions]+[HumanMessage(content="Write conclusion.")])
     return {"conclusion": conclusion.content}
 
 def finalize_report(state: ResearchGraphState):
@@ -209,18 +386,54 @@ def human_feedback(state): pass
 def initiate_all_interviews(state):
     if state.get('human_analyst_feedback'): return "create_analysts"
     topic = state["topic"]
-    return [Send("conduct_interview", {
-        "analyst": analyst,
-        "messages": [HumanMessage(content=f"So you said you were writing an article on {topic}?")]
-    }) for analyst in state["analysts"]]
-
-def route_messages(state, name="expert"):
-    messages = state["messages"]
-    if len([m for m in messages if isinstance(m, AIMessage) and m.name == name]) >= state.get('max_num_turns', 2):
-        return 'save_interview'
-    if "Thank you so much for your help" in messages[-2].content:
-        return 'save_interview'
-    return "ask_question"
+    sends = []
+    for analyst in state["analysts"]:
+        cached = get_interview(topic, analyst)
+        if cached:
+            sends.append(Send("reuse_interview", {"analyst": analyst, "section": cached["section"]}))
+        else:
+            sends.append(Send("conduct_interview", {
+                "topic": topic,
+                "analyst": analyst,
+                "messages": [opening_message(topic)]
+            }))
+    return sends
+
+def is_novel(stats: dict, threshold: float) -> bool:
+    return bool(stats["docs"]) and stats["new_docs"] / stats["docs"] >= threshold and stats["new_chars"] >= MIN_NEW_CHARS
+
+def stop_reason(state):
+    """ Why the interview should end after the latest answer, or None to ask another question """
+    turn_stats = state.get("turn_stats") or []
+    turns = len(turn_stats)
+    planned = state.get("max_num_turns") or PLANNED_INTERVIEW_TURNS
+    cap = max(planned, MAX_INTERVIEW_TURNS)
+    if "Thank you so much for your help" in state["messages"][-2].content:
+        return "analyst_done"
+    if turns >= cap:
+        return "turn_cap" if cap > planned else "max_turns"
+    if not turn_stats:
+        return None
+    if turns >= MIN_INTERVIEW_TURNS and not is_novel(turn_stats[-1], MIN_NOVELTY):
+        return "diminishing_returns"
+    # Past the planned length only while the last turn was still mostly new material
+    if turns >= planned and not is_novel(turn_stats[-1], EXTRA_TURN_NOVELTY):
+        return "max_turns"
+    return None
+
+def route_messages(state):
+    return 'save_interview' if stop_reason(state) else "ask_question"
+
+def interview_stats() -> dict:
+    with _interview_stats_lock:
+        stats = {**_interview_stats, "stop_reasons": dict(_interview_stats["stop_reasons"])}
+    count = stats["interviews"]
+    return {
+        "interviews": count,
+        "avg_turns": round(stats["turns"] / count, 2) if count else 0.0,
+        "max_turns": stats["max_turns"],
+        "stop_reasons": stats["stop_reasons"],
+    }
 
 # --- GRAPH COMPILATION ---
 
@@ -228,19 +441,24 @@ def build_graph():
     """Compiles and returns the LangGraph executable"""
     
     # 1. Interview Sub-Graph
-    interview_builder = StateGraph(InterviewState)
+    interview_builder = StateGraph(InterviewState, output_schema=InterviewOutputState)
     interview_builder.add_node("ask_question", generate_question)
+    interview_builder.add_node("plan_queries", plan_queries)
     interview_builder.add_node("search_web", search_web)
     interview_builder.add_node("search_wikipedia", search_wikipedia)
+    interview_builder.add_node("search_local", search_local)
     interview_builder.add_node("answer_question", generate_answer)
     interview_builder.add_node("save_interview", save_interview)
     interview_builder.add_node("write_section", write_section)
 
     interview_builder.add_edge(START, "ask_question")
-    interview_builder.add_edge("ask_question", "search_web")
-    interview_builder.add_edge("ask_question", "search_wikipedia")
+    interview_builder.add_edge("ask_question", "plan_queries")
+    interview_builder.add_edge("plan_queries", "search_web")
+    interview_builder.add_edge("plan_queries", "search_wikipedia")
+    interview_builder.add_edge("plan_queries", "search_local")
     interview_builder.add_edge("search_web", "answer_question")
     interview_builder.add_edge("search_wikipedia", "answer_question")
+    interview_builder.add_edge("search_local", "answer_question")
     interview_builder.add_conditional_edges("answer_question", route_messages, ['ask_question', 'save_interview'])
     interview_builder.add_edge("save_interview", "write_section")
     interview_builder.add_edge("write_section", END)
@@ -252,6 +470,8 @@ def build_graph():
     builder.add_node("create_analysts", create_analysts)
     builder.add_node("human_feedback", human_feedback)
     builder.add_node("conduct_interview", interview_graph)
+    builder.add_node("reuse_interview", reuse_interview)
+    builder.add_node("condense_sections", condense_sections)
     builder.add_node("write_report", write_report)
     builder.add_node("write_introduction", write_introduction)
     builder.add_node("write_conclusion", write_conclusion)
@@ -259,15 +479,29 @@ def build_graph():
 
     builder.add_edge(START, "create_analysts")
     builder.add_edge("create_analysts", "human_feedback")
-    builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview"])
-    builder.add_edge("conduct_interview", "write_report")
-    builder.add_edge("conduct_interview", "write_introduction")
-    builder.add_edge("conduct_interview", "write_conclusion")
+    builder.add_conditional_edges("human_feedback", initiate_all_interviews, ["create_analysts", "conduct_interview", "reuse_interview"])
+    builder.add_edge("conduct_interview", "condense_sections")
+    builder.add_edge("reuse_interview", "condense_sections")
+    builder.add_edge("condense_sections", "write_report")
+    builder.add_edge("condense_sections", "write_introduction")
+    builder.add_edge("condense_sections", "write_conclusion")
     builder.add_edge(["write_conclusion", "write_report", "write_introduction"], "finalize_report")
     builder.add_edge("finalize_report", END)
 
-    memory = MemorySaver()
-    return builder.compile(interrupt_before=['human_feedback'], checkpointer=memory)
-
-# Export the ready-to-use graph
-graph = build_graph()
\ No newline at end of file
+    # Durable, shared across worker processes. Every pydantic model kept in graph or
+    # interview state must be listed, or it is restored as a plain dict
+    checkpointer = get_checkpointer(allowed_types=[("src.helper", "Analyst"), ("src.helper", "SearchQueries")])
+    return builder.compile(interrupt_before=['human_feedback'], checkpointer=checkpointer)
+
+@lru_cache(maxsize=None)
+def get_graph():
+    """Compiles the graph on first use; the same instance serves the whole process"""
+    # Build the local document index before the first interview needs it
+    start_local_index()
+    return build_graph()
+
+def __getattr__(name):
+    # `from src.helper import graph` keeps working, compiled on first access
+    if name == "graph":
+        return get_graph()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
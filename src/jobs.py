@@ -0,0 +1,291 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import CACHE_DIR
+
+# Finished jobs are kept this long so a reconnecting browser can still read the result
+JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", 15 * 60))
+# Unfinished jobs are only dropped after this long without a new event (their process died)
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", 6 * 3600))
+HEARTBEAT_SECONDS = 15
+# How often a process that does not own a job polls the shared store for new events
+POLL_SECONDS = 0.5
+
+# --- SHARED STORE ---
+
+class JobStore:
+    """
+    Persists job events in SQLite so any worker process can stream any job.
+
+    The process running a job appends events here; a browser whose /events
+    request lands on another process is served by polling this table.
+    """
+
+    def __init__(self, path: str):
+        # The file is created on first use, so importing the app touches no disk
+        self.path = path
+        self._local = threading.local()
+        self._setup_lock = threading.Lock()
+        self._is_setup = False
+
+    def _setup(self, conn: sqlite3.Connection):
+        conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, status TEXT NOT NULL, updated_at REAL NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_events ("
+            " job_id TEXT NOT NULL, idx INTEGER NOT NULL, event TEXT NOT NULL, data TEXT,"
+            " PRIMARY KEY (job_id, idx))"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            with self._setup_lock:
+                directory = os.path.dirname(self.path)
+                if directory and not self._is_setup:
+                    os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+                conn.execute("PRAGMA journal_mode=WAL")
+                if not self._is_setup:
+                    self._setup(conn)
+                    self._is_setup = True
+            self._local.conn = conn
+        return conn
+
+    def set_status(self, job_id: str, status: str):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO jobs (id, status, updated_at) VALUES (?, ?, ?)", (job_id, status, time.time())
+        )
+
+    def status(self, job_id: str):
+        row = self._conn().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+
+    def append(self, job_id: str, idx: int, event: str, data):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO job_events (job_id, idx, event, data) VALUES (?, ?, ?, ?)",
+            (job_id, idx, event, json.dumps(data)),
+        )
+        # Every event counts as activity, so a long run is never mistaken for a stale one
+        conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def events(self, job_id: str, start: int = 0) -> list:
+        rows = self._conn().execute(
+            "SELECT event, data FROM job_events WHERE job_id = ? AND idx >= ? ORDER BY idx", (job_id, start)
+        ).fetchall()
+        return [(event, json.loads(data)) for event, data in rows]
+
+    def prune(self):
+        conn = self._conn()
+        now = time.time()
+        expired = [row[0] for row in conn.execute(
+            "SELECT id FROM jobs WHERE (status IN ('done', 'error') AND updated_at < ?) OR updated_at < ?",
+            (now - JOB_TTL_SECONDS, now - JOB_STALE_SECONDS),
+        )]
+        for job_id in expired:
+            conn.execute("DELETE FROM job_events WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+# --- JOB ---
+
+class Job:
+    """A background research run and the ordered list of events it has produced."""
+
+    def __init__(self, store: JobStore = None):
+        self.id = uuid.uuid4().hex
+        self.store = store
+        self.status = "queued"
+        self.events = []
+        self.created_at = time.time()
+        self.finished_at = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "error")
+
+    def _record(self, event: str, data):
+        if self.store is not None:
+            self.store.append(self.id, len(self.events), event, data)
+        self.events.append((event, data))
+
+    def _set_status(self, status: str):
+        self.status = status
+        if self.store is not None:
+            self.store.set_status(self.id, status)
+
+    def emit(self, event: str, data=None):
+        with self._cond:
+            self._record(event, data)
+            self._cond.notify_all()
+
+    def progress(self, message: str):
+        self.emit("progress", {"message": message})
+
+    def _finish(self, status: str, event: str, data):
+        with self._cond:
+            self._record(event, data)
+            self._set_status(status)
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def follow(self, start: int = 0):
+        """Yields (event, data) from `start` until the job ends; yields None as a heartbeat."""
+        index = start
+        while True:
+            with self._cond:
+                if index >= len(self.events) and not self.done:
+                    self._cond.wait(HEARTBEAT_SECONDS)
+                pending = self.events[index:]
+                finished = self.done
+            if not pending and not finished:
+                yield None
+            for item in pending:
+                yield item
+            index += len(pending)
+            if finished and index >= len(self.events):
+                return
+
+class RemoteJob:
+    """Read-only view of a job owned by another worker process."""
+
+    def __init__(self, job_id: str, store: JobStore):
+        self.id = job_id
+        self.store = store
+
+    def follow(self, start: int = 0):
+        index = start
+        last_event = time.monotonic()
+        while True:
+            status = self.store.status(self.id)
+            if status is None:
+                return  # expired, or the owning process never recorded it
+            finished = status in ("done", "error")
+            pending = self.store.events(self.id, index)
+            for item in pending:
+                yield item
+            index += len(pending)
+            if pending:
+                last_event = time.monotonic()
+            if finished and not pending:
+                return
+            if time.monotonic() - last_event > HEARTBEAT_SECONDS:
+                last_event = time.monotonic()
+                yield None
+            time.sleep(POLL_SECONDS)
+
+# --- MANAGER ---
+
+class JobManager:
+    """Runs jobs on a small thread pool so HTTP request threads return immediately."""
+
+    def __init__(self, max_workers: int = 4, store: JobStore = None):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs) -> Job:
+        """Schedules `fn(job, *args, **kwargs)`; its return value becomes the job's `result` event."""
+        job = Job(self.store)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job._set_status("queued")
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str):
+        """Returns the local job, a RemoteJob if another process owns it, or None."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None and self.store.status(job_id):
+            job = RemoteJob(job_id, self.store)
+        return job
+
+    def status(self, job_id: str):
+        """"queued", "running", "done" or "error"; None for unknown or expired jobs."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job.status
+        return self.store.status(job_id) if self.store is not None else None
+
+    def _run(self, job, fn, args, kwargs):
+        job._set_status("running")
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            print(f"Error in job {job.id}: {e}")
+            job._finish("error", "error", {"message": "❌ An error occurred. Please refresh the page and try again."})
+        else:
+            job._finish("done", "result", result)
+
+    def _prune(self):
+        cutoff = time.time() - JOB_TTL_SECONDS
+        for job_id in [j.id for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+        if self.store is not None:
+            self.store.prune()
+
+# --- COALESCING ---
+
+class JobFlight:
+    """
+    Single-flight for jobs: while one job runs under a key, identical jobs attach
+    to it and replay its events (progress, streamed tokens) instead of repeating
+    the work. Coalescing is per process; use a shared cache across processes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leaders = {}
+
+    def run(self, key, job: Job, fn):
+        """Runs `fn()` for `job`, or mirrors the job already running under `key` and returns its result."""
+        with self._lock:
+            leader = self._leaders.get(key)
+            if leader is None:
+                self._leaders[key] = job
+        if leader is None:
+            try:
+                return fn()
+            finally:
+                with self._lock:
+                    self._leaders.pop(key, None)
+        return self._mirror(leader, job)
+
+    def _mirror(self, leader: Job, job: Job):
+        for item in leader.follow():
+            if item is None:
+                continue
+            event, data = item
+            if event == "result":
+                return data
+            if event == "error":
+                raise RuntimeError(data.get("message"))
+            job.emit(event, data)
+        raise RuntimeError(f"Job {leader.id} ended without a result")
+
+# --- SERVER-SENT EVENTS ---
+
+def format_sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_stream(job: Job):
+    """Renders a job's events as an SSE body; comment lines keep idle proxies from closing it."""
+    for item in job.follow():
+        if item is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield format_sse(*item)
+
+jobs = JobManager(
+    max_workers=int(os.getenv("JOB_WORKERS", 4)),
+    store=JobStore(os.getenv("JOB_STORE_PATH", os.path.join(CACHE_DIR, "jobs.sqlite"))),
+)
@@ -0,0 +1,336 @@
+import json
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessageChunk, BaseMessage, get_buffer_string
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from src.metrics import LLM_EJECTIONS
+from src.ratelimit import ModelScheduler
+
+# Rough output allowance reserved against the TPM budget before the real usage is known
+EXPECTED_COMPLETION_TOKENS = 512
+
+# --- HELPERS ---
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    """Cheap ~4 chars/token estimate, good enough for budgeting."""
+    return len(get_buffer_string(messages)) // 4 + EXPECTED_COMPLETION_TOKENS
+
+def is_rate_limited(error: Exception) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError" or "rate limit" in str(error).lower()
+
+def retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def is_member_failure(error: Exception) -> bool:
+    """
+    True when the error is specific to one key/endpoint (throttling, auth,
+    outage, network) so another pool member may succeed. Malformed requests
+    would fail everywhere and are raised as they are.
+    """
+    if is_rate_limited(error):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status not in (400, 413, 422)
+    name = type(error).__name__
+    return "Connection" in name or "Timeout" in name
+
+def can_stream(model: BaseChatModel) -> bool:
+    return type(model)._stream is not BaseChatModel._stream
+
+def as_chunk(generation) -> ChatGenerationChunk:
+    """A whole generation as a single stream chunk, for models that cannot stream."""
+    message = generation.message
+    return ChatGenerationChunk(
+        message=AIMessageChunk(
+            content=message.content,
+            additional_kwargs=message.additional_kwargs,
+            response_metadata=message.response_metadata,
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(getattr(message, "tool_calls", None) or [])
+            ],
+            usage_metadata=getattr(message, "usage_metadata", None),
+            id=message.id,
+        ),
+        generation_info=generation.generation_info,
+    )
+
+def usage_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return usage.get("total_tokens")
+    return None
+
+# --- SCHEDULED MODEL ---
+
+class ScheduledChatModel(BaseChatModel):
+    """
+    Wraps a chat model so every call is admitted by a shared ModelScheduler.
+
+    The wrapper is itself a chat model, so `with_structured_output`, `with_retry`
+    and LangGraph message streaming all keep working. 429s are reported to the
+    scheduler (which backs off for everyone) and retried here, after the cooldown,
+    instead of sleeping blindly in the node functions.
+    """
+
+    inner: BaseChatModel
+    scheduler: ModelScheduler
+    max_throttle_retries: int = 6
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    @property
+    def _llm_type(self) -> str:
+        return f"scheduled-{self.inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"scheduler": self.scheduler.name, **self.inner._identifying_params}
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        # Report the wrapped provider/model so tracing can label calls by model
+        return self.inner._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        # Let the wrapped provider format tools, then bind the same kwargs on the wrapper
+        bound = self.inner.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _thread_key(self, run_manager) -> str:
+        metadata = getattr(run_manager, "metadata", None) or {}
+        return str(metadata.get("thread_id", "default"))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self._thread_key(run_manager)
+        estimate = estimate_tokens(messages)
+        for attempt in range(self.max_throttle_retries + 1):
+            ticket = self.scheduler.acquire(estimate, key)
+            try:
+                result = self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                throttled = is_rate_limited(e)
+                self.scheduler.release(ticket, throttled=throttled, failed=not throttled,
+                                       retry_after=retry_after(e) if throttled else None)
+                if throttled and attempt < self.max_throttle_retries:
+                    continue
+                raise
+            used = usage_tokens(result.generations[0].message) if result.generations else None
+            self.scheduler.release(ticket, tokens_used=used)
+            return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        if not can_stream(self.inner):
+            # The base _stream raises NotImplementedError, which would look like a member failure
+            result = self._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            chunk = as_chunk(result.generations[0])
+            if run_manager and isinstance(chunk.message.content, str):
+                run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+            return
+        key = self._thread_key(run_manager)
+        estimate = estimate_tokens(messages)
+        for attempt in range(self.max_throttle_retries + 1):
+            ticket = self.scheduler.acquire(estimate, key)
+            started = False
+            used = None
+            try:
+                for chunk in self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    used = usage_tokens(chunk.message) or used
+                    yield chunk
+            except GeneratorExit:
+                self.scheduler.release(ticket, tokens_used=used)
+                raise
+            except Exception as e:
+                # Only retry if nothing was emitted yet, otherwise the caller would see duplicates
+                throttled = is_rate_limited(e)
+                self.scheduler.release(ticket, throttled=throttled, failed=not throttled,
+                                       retry_after=retry_after(e) if throttled else None)
+                if throttled and not started and attempt < self.max_throttle_retries:
+                    continue
+                raise
+            self.scheduler.release(ticket, tokens_used=used)
+            return
+
+# --- POOLED MODEL ---
+
+class PooledChatModel(BaseChatModel):
+    """
+    Spreads calls over several scheduled models, e.g. one per API key and model endpoint.
+
+    Each call goes to the healthy member with the fewest outstanding requests
+    (ties broken by remaining rate-limit headroom). A member that is throttled
+    or failing is ejected for a while and the call fails over to the next one;
+    `fallbacks` (typically a smaller model) are only used once every primary
+    member is ejected or has already failed this call. Members should be built
+    with `max_throttle_retries=0` so a 429 moves the call to another key
+    instead of waiting on the throttled one.
+    """
+
+    members: List[ScheduledChatModel]
+    fallbacks: List[ScheduledChatModel] = []
+    max_attempts: int = 7
+    eject_seconds: float = 15.0
+    max_eject_seconds: float = 300.0
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _outstanding: dict = PrivateAttr(default_factory=dict)
+    _ejected_until: dict = PrivateAttr(default_factory=dict)
+    _failures: dict = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"pooled-{self.members[0].inner._llm_type}"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {
+            "members": [m.scheduler.name for m in self.members],
+            "fallbacks": [m.scheduler.name for m in self.fallbacks],
+        }
+
+    def _get_ls_params(self, stop=None, **kwargs):
+        # Known before a member is picked; results carry the served model as `model_name`
+        return self.members[0]._get_ls_params(stop=stop, **kwargs)
+
+    def bind_tools(self, tools, **kwargs):
+        # All members share a provider, so the primary's tool format works for every one
+        bound = self.members[0].inner.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    # -- member selection --
+
+    def _all(self) -> list:
+        return self.members + self.fallbacks
+
+    def _pick(self, tried: set) -> int:
+        """Index into _all() of the member to use next."""
+        now = time.monotonic()
+        everyone = self._all()
+        with self._lock:
+            for tier in (range(len(self.members)), range(len(self.members), len(everyone))):
+                healthy = [i for i in tier if i not in tried and self._ejected_until.get(i, 0) <= now]
+                if healthy:
+                    index = min(healthy, key=lambda i: (self._outstanding.get(i, 0), -everyone[i].scheduler.headroom()))
+                    break
+            else:
+                # Everyone is ejected or already failed: wait on whoever recovers first
+                # (its scheduler holds the call until the throttle cooldown has passed)
+                index = min(range(len(everyone)), key=lambda i: self._ejected_until.get(i, 0))
+            self._outstanding[index] = self._outstanding.get(index, 0) + 1
+        return index
+
+    def _served(self, index: int, stop=None, **kwargs) -> str:
+        return self._all()[index]._get_ls_params(stop=stop, **kwargs).get("ls_model_name", "unknown")
+
+    def _done(self, index: int, error: Exception = None):
+        with self._lock:
+            self._outstanding[index] -= 1
+            if error is None:
+                self._failures.pop(index, None)
+                self._ejected_until.pop(index, None)
+                return
+            failures = self._failures.get(index, 0) + 1
+            self._failures[index] = failures
+            throttled = is_rate_limited(error)
+            duration = (throttled and retry_after(error)) or min(
+                self.max_eject_seconds, self.eject_seconds * 2 ** (failures - 1)
+            )
+            self._ejected_until[index] = time.monotonic() + duration
+        member = self._all()[index]
+        LLM_EJECTIONS.inc(model=member.scheduler.name, reason="throttled" if throttled else "error")
+        print(f"    (LLM pool: ejected {member.scheduler.name} for {duration:.0f}s after {type(error).__name__})")
+
+    # -- calls --
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tried = set()
+        for attempt in range(self.max_attempts):
+            index = self._pick(tried)
+            try:
+                result = self._all()[index]._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                if not is_member_failure(e):
+                    self._done(index)
+                    raise
+                self._done(index, e)
+                tried.add(index)
+                if attempt + 1 < self.max_attempts:
+                    continue
+                raise
+            self._done(index)
+            # The provider's own model_name wins; otherwise label the result with the member
+            result.llm_output = {"model_name": self._served(index, stop, **kwargs), **(result.llm_output or {})}
+            return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tried = set()
+        for attempt in range(self.max_attempts):
+            index = self._pick(tried)
+            started = False
+            labelled = False
+            try:
+                for chunk in self._all()[index]._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                    started = True
+                    labelled = labelled or "model_name" in (chunk.generation_info or {}) \
+                        or "model_name" in chunk.message.response_metadata
+                    yield chunk
+                if not labelled:
+                    # Chunk metadata is concatenated when merged, so the label goes on exactly one chunk
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=""),
+                                              generation_info={"model_name": self._served(index, stop, **kwargs)})
+            except GeneratorExit:
+                self._done(index)
+                raise
+            except Exception as e:
+                if not is_member_failure(e):
+                    self._done(index)
+                    raise
+                self._done(index, e)
+                tried.add(index)
+                # Once tokens were emitted a failover would duplicate them
+                if not started and attempt + 1 < self.max_attempts:
+                    continue
+                raise
+            self._done(index)
+            return
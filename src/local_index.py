@@ -0,0 +1,274 @@
+"""
+Local document index: a third retrieval source that works without network access.
+
+Markdown, text, HTML and (with the optional `pypdf` package) PDF files under
+LOCAL_DOCS_DIR are split into chunks and stored in an SQLite FTS5 table, ranked
+with BM25. Re-indexing is incremental: unchanged files (same mtime and size, or
+same content hash) are skipped and deleted files are dropped. A running process
+re-indexes on a background thread, so lookups only ever read the index.
+
+    python -m src.local_index ./docs          # (re)index a directory
+    python -m src.local_index ./docs --query "solid state batteries"
+"""
+import argparse
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from html.parser import HTMLParser
+
+from src.cache import CACHE_DIR
+from src.context import chunk_document, CHUNK_TOKENS
+from src.metrics import SEARCH_DURATION, SEARCH_REQUESTS
+
+# --- CONFIGURATION ---
+LOCAL_DOCS_DIR = os.getenv("LOCAL_DOCS_DIR", "")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", os.path.join(CACHE_DIR, "local_index.sqlite"))
+LOCAL_SEARCH_RESULTS = int(os.getenv("LOCAL_SEARCH_RESULTS", 3))
+# How often a running process re-checks LOCAL_DOCS_DIR for changed files (0 = only once)
+LOCAL_INDEX_REFRESH = float(os.getenv("LOCAL_INDEX_REFRESH", 300))
+
+TEXT_EXTENSIONS = {".md", ".markdown", ".txt", ".rst"}
+HTML_EXTENSIONS = {".html", ".htm"}
+PDF_EXTENSIONS = {".pdf"}
+
+# --- TEXT EXTRACTION ---
+
+class _TextExtractor(HTMLParser):
+    SKIP = {"script", "style", "noscript", "head"}
+    BLOCKS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "section", "article"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts, self._skipping = [], 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    text = "".join(parser.parts)
+    return re.sub(r"\n\s*\n+", "\n\n", re.sub(r"[ \t]+", " ", text)).strip()
+
+def extract_text(path: str):
+    """Plain text of a supported file, or None if the type is unsupported or unreadable."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in TEXT_EXTENSIONS or ext in HTML_EXTENSIONS:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        return html_to_text(text) if ext in HTML_EXTENSIONS else text
+    if ext in PDF_EXTENSIONS:
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            print(f"    (Local index: skipping {path}, install pypdf to index PDFs)")
+            return None
+        return "\n\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+    return None
+
+def file_hash(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# --- INDEX ---
+
+class LocalIndex:
+    """Persistent BM25 (SQLite FTS5) index over the chunks of a document directory."""
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime REAL, size INTEGER, sha1 TEXT)")
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5("
+            " path UNINDEXED, position UNINDEXED, content, tokenize='porter unicode61')"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _replace(self, conn, path: str, text: str):
+        conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+        chunks = chunk_document({"content": text}, CHUNK_TOKENS * 2) if text.strip() else []
+        conn.executemany(
+            "INSERT INTO chunks (path, position, content) VALUES (?, ?, ?)",
+            [(path, chunk["position"], chunk["text"]) for chunk in chunks],
+        )
+        return len(chunks)
+
+    def sync(self, directory: str) -> dict:
+        """Incrementally (re)indexes `directory`; returns counts of what changed."""
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "skipped": 0, "chunks": 0}
+        supported = TEXT_EXTENSIONS | HTML_EXTENSIONS | PDF_EXTENSIONS
+        directory = os.path.abspath(directory)
+        with self._sync_lock:
+            conn = self._conn()
+            known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime, size, sha1 FROM files")}
+            present = set()
+            for root, _, names in os.walk(directory):
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    if os.path.splitext(name)[1].lower() not in supported:
+                        continue
+                    present.add(path)
+                    stat = os.stat(path)
+                    previous = known.get(path)
+                    if previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                        stats["unchanged"] += 1
+                        continue
+                    sha1 = file_hash(path)
+                    conn.execute("BEGIN")
+                    try:
+                        if previous and previous[2] == sha1:
+                            stats["unchanged"] += 1  # touched, not modified
+                        else:
+                            try:
+                                text = extract_text(path)
+                            except Exception as e:
+                                print(f"    (Local index: could not read {path}: {e})")
+                                text = None
+                            if text is None:
+                                # Not recorded, so it is retried once it becomes readable (e.g. pypdf installed)
+                                conn.execute("ROLLBACK")
+                                stats["skipped"] += 1
+                                continue
+                            stats["chunks"] += self._replace(conn, path, text)
+                            stats["updated" if previous else "added"] += 1
+                        conn.execute("INSERT OR REPLACE INTO files (path, mtime, size, sha1) VALUES (?, ?, ?, ?)",
+                                     (path, stat.st_mtime, stat.st_size, sha1))
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        conn.execute("ROLLBACK")
+                        raise
+            for path in known:
+                if path.startswith(directory + os.sep) and path not in present:
+                    conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                    conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                    stats["removed"] += 1
+        return stats
+
+    def is_empty(self) -> bool:
+        return self._conn().execute("SELECT 1 FROM files LIMIT 1").fetchone() is None
+
+    def search(self, query: str, limit: int = LOCAL_SEARCH_RESULTS) -> list:
+        """Best-matching chunks as {url, content}, most relevant first."""
+        terms = re.findall(r"\w+", query.lower())
+        if not terms:
+            return []
+        # Quote every term so FTS5 operators in the query are taken literally
+        match = " OR ".join(f'"{term}"' for term in dict.fromkeys(terms))
+        rows = self._conn().execute(
+            "SELECT path, position, content FROM chunks WHERE chunks MATCH ? ORDER BY bm25(chunks) LIMIT ?",
+            (match, limit),
+        ).fetchall()
+        # One URL per chunk, so context dedup keeps several passages of one file
+        return [{"url": f"file://{path}#chunk-{position}", "content": content} for path, position, content in rows]
+
+# --- PROCESS-WIDE INDEX ---
+
+_index = None
+_index_lock = threading.Lock()
+_refresher = None
+# Set once the index is complete: built by this process, or left by an earlier one
+_ready = threading.Event()
+
+def _get_index() -> LocalIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LocalIndex()
+        return _index
+
+def start_refresh():
+    """Indexes LOCAL_DOCS_DIR on a background thread, then re-checks it every LOCAL_INDEX_REFRESH seconds."""
+    global _refresher
+    if not LOCAL_DOCS_DIR:
+        return
+    with _index_lock:
+        if _refresher is not None:
+            return
+        _refresher = threading.Thread(target=_refresh_loop, name="local-index", daemon=True)
+        _refresher.start()
+
+def _refresh_loop():
+    index = _get_index()
+    if not index.is_empty():
+        _ready.set()
+    while True:
+        if os.path.isdir(LOCAL_DOCS_DIR):
+            started = time.perf_counter()
+            try:
+                stats = index.sync(LOCAL_DOCS_DIR)
+                if stats["added"] or stats["updated"] or stats["removed"]:
+                    print(f"    (Local index: synced {LOCAL_DOCS_DIR} in {time.perf_counter() - started:.1f}s: {stats})")
+            except Exception as e:
+                print(f"    (Local index: sync failed: {e})")
+        _ready.set()
+        if not LOCAL_INDEX_REFRESH:
+            return
+        time.sleep(LOCAL_INDEX_REFRESH)
+
+def search_local(query: str) -> list:
+    """Searches the indexed LOCAL_DOCS_DIR; finds nothing until the first index build has finished."""
+    if not LOCAL_DOCS_DIR:
+        return []
+    start_refresh()
+    if not _ready.is_set():
+        return []
+    started = time.perf_counter()
+    results = _get_index().search(query)
+    SEARCH_REQUESTS.inc(source="local", cache="index")
+    SEARCH_DURATION.observe(time.perf_counter() - started, source="local", cache="index")
+    return results
+
+# --- CLI ---
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", nargs="?", default=LOCAL_DOCS_DIR, help="Directory to index (default: LOCAL_DOCS_DIR)")
+    parser.add_argument("--index", default=LOCAL_INDEX_PATH, help="Index file")
+    parser.add_argument("--query", help="Run a test query after indexing")
+    args = parser.parse_args(argv)
+    if not args.directory:
+        parser.error("pass a directory or set LOCAL_DOCS_DIR")
+
+    index = LocalIndex(args.index)
+    started = time.perf_counter()
+    stats = index.sync(args.directory)
+    print(f"Indexed {args.directory} in {time.perf_counter() - started:.2f}s: {stats}")
+    if args.query:
+        started = time.perf_counter()
+        results = index.search(args.query)
+        print(f"{len(results)} results in {(time.perf_counter() - started) * 1000:.1f} ms")
+        for result in results:
+            print(f"- {result['url']}: {result['content'][:120]!r}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import threading
+from bisect import bisect_left
+
+# Seconds; spans a cached lookup up to a full report write
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# --- METRIC TYPES ---
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def _label_str(self, key: tuple, extra: dict = None) -> str:
+        pairs = list(zip(self.labels, key)) + list((extra or {}).items())
+        if not pairs:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(self._render_values(items))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_values(self, items):
+        return [f"{self.name}{self._label_str(key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _render_values(self, items):
+        return [f"{self.name}{self._label_str(key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def _render_values(self, items):
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{self._label_str(key, {'le': bound})} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{self._label_str(key, {'le': '+Inf'})} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {round(total, 6)}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {cumulative}")
+        return lines
+
+# --- REGISTRY ---
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, labels, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text, labels=()) -> Counter:
+        return self._get(Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, labels=()) -> Gauge:
+        return self._get(Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, fn):
+        """Registers `fn()` to refresh gauges right before every scrape."""
+        with self._lock:
+            self._collectors.append(fn)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collect in collectors:
+            collect()
+        with self._lock:
+            metrics = [self._metrics[name] for name in sorted(self._metrics)]
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+registry = Registry()
+
+# --- APPLICATION METRICS ---
+
+NODE_DURATION = registry.histogram("research_node_duration_seconds", "Wall time of graph node runs.", ("node",))
+NODE_ERRORS = registry.counter("research_node_errors_total", "Graph node runs that raised.", ("node",))
+
+LLM_DURATION = registry.histogram("research_llm_duration_seconds", "LLM call latency, including scheduler wait.", ("node", "model"))
+LLM_REQUESTS = registry.counter("research_llm_requests_total", "LLM calls by outcome.", ("node", "model", "status"))
+LLM_TOKENS = registry.counter("research_llm_tokens_total", "Tokens reported by the provider.", ("node", "model", "type"))
+LLM_RETRIES = registry.counter("research_llm_retries_total", "Retries issued by with_retry.", ("node",))
+LLM_QUEUE_WAIT = registry.histogram("research_llm_queue_wait_seconds", "Time spent waiting in the rate-limit scheduler.", ("model",))
+LLM_THROTTLED = registry.counter("research_llm_throttled_total", "429 responses seen by the scheduler.", ("model",))
+LLM_QUEUE_DEPTH = registry.gauge("research_llm_queue_depth", "Callers waiting in the scheduler.", ("model",))
+LLM_IN_FLIGHT = registry.gauge("research_llm_in_flight", "LLM calls currently running.", ("model",))
+LLM_CONCURRENCY = registry.gauge("research_llm_concurrency_limit", "Adaptive concurrency limit.", ("model",))
+LLM_EJECTIONS = registry.counter("research_llm_pool_ejections_total", "Pool members temporarily ejected.", ("model", "reason"))
+
+SEARCH_DURATION = registry.histogram("research_search_duration_seconds", "Search lookup latency by cache status.", ("source", "cache"))
+SEARCH_REQUESTS = registry.counter("research_search_requests_total", "Search lookups by cache status.", ("source", "cache"))
+SEARCH_ERRORS = registry.counter("research_search_errors_total", "Search lookups that raised.", ("source",))
+
+INTERVIEW_STOPS = registry.counter("research_interview_stops_total", "Finished interviews by stop reason.", ("reason",))
+INTERVIEW_TURNS = registry.histogram("research_interview_turns", "Question/answer turns per interview.", ("reason",), buckets=(1, 2, 3, 4, 6, 8, 12))
+PREFETCH_TURNS = registry.counter("research_prefetch_turns_total", "Speculative first interview turns by outcome.", ("outcome",))
+REPORT_REQUESTS = registry.counter("research_report_requests_total", "Approved research runs by report cache outcome.", ("cache",))
+
+CONTEXT_TOKENS = registry.counter("research_context_tokens_total", "Context tokens before and after compaction.", ("stage",))
+RENDER_DURATION = registry.histogram("research_render_duration_seconds", "Markdown to HTML rendering time.")
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.cache import CACHE_DIR, SQLiteCache, get_interview, interview_key
+from src.metrics import PREFETCH_TURNS
+
+# --- CONFIGURATION ---
+# Opt-in: while the user reviews the proposed analysts, run each interview's first
+# turn (question, query planning, searches) speculatively. On approval the real run
+# adopts the stored question and plan, and the searches hit the warmed search cache.
+PREFETCH_ENABLED = os.getenv("PREFETCH", "0") == "1"
+# Provider-reported tokens a thread may spend speculatively, across all its feedback rounds
+PREFETCH_TOKEN_BUDGET = int(os.getenv("PREFETCH_TOKEN_BUDGET", 20000))
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", 30 * 60))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", 2))
+
+_store = None
+_executor = None
+_lock = threading.Lock()
+_runs = {}    # thread_id -> cancel event of its running prefetch
+_spent = {}   # thread_id -> (tokens spent by finished runs, time of the last run)
+
+def _scratch() -> SQLiteCache:
+    global _store
+    with _lock:
+        if _store is None:
+            _store = SQLiteCache(os.getenv("PREFETCH_PATH", os.path.join(CACHE_DIR, "prefetch.sqlite")))
+        return _store
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            # Separate from the job pool so speculation never delays a user's request
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        return _executor
+
+# --- SCRATCH AREA ---
+
+def get_prefetched(topic: str, analyst):
+    """Returns {"question", "search_queries"} prefetched for this analyst's first turn, or None."""
+    if not PREFETCH_ENABLED:
+        return None
+    return _scratch().get("turn", interview_key(topic, analyst))
+
+def adopted():
+    PREFETCH_TURNS.inc(outcome="adopted")
+
+# --- SPECULATION ---
+
+def start(thread_id: str, topic: str, analysts: list):
+    """Prefetches the first turn of every analyst in the background, replacing any earlier run."""
+    if not PREFETCH_ENABLED:
+        return
+    cancel(thread_id)
+    cancelled = threading.Event()
+    now = time.monotonic()
+    with _lock:
+        # Threads abandoned at the review: their prefetched turns have expired as well
+        for stale in [t for t, (_, at) in _spent.items() if now - at > PREFETCH_TTL]:
+            del _spent[stale]
+        _spent[thread_id] = (_spent.get(thread_id, (0, now))[0], now)
+        _runs[thread_id] = cancelled
+    _pool().submit(_run, thread_id, topic, list(analysts), cancelled)
+
+def cancel(thread_id: str):
+    """Stops speculation for a thread (feedback or approval arrived). Finished turns stay reusable."""
+    with _lock:
+        cancelled = _runs.pop(thread_id, None)
+    if cancelled is not None:
+        cancelled.set()
+
+def finish(thread_id: str):
+    """Stops speculation for good (the analysts were approved or the thread ended) and forgets its budget."""
+    cancel(thread_id)
+    with _lock:
+        _spent.pop(thread_id, None)
+
+def _run(thread_id, topic, analysts, cancelled):
+    from langchain_core.runnables import RunnableLambda
+    from src import helper
+    from src.tracing import RunTracer
+
+    tracer = RunTracer()
+    # Own fairness key, so speculation queues behind nobody's real run in the scheduler
+    config = {"callbacks": [tracer], "metadata": {"thread_id": f"prefetch-{thread_id}"}}
+
+    def used():
+        return tracer.llm["input_tokens"] + tracer.llm["output_tokens"]
+
+    def spent():
+        return _spent.get(thread_id, (0, 0))[0] + used()
+
+    try:
+        for analyst in analysts:
+            if cancelled.is_set():
+                break
+            if spent() >= PREFETCH_TOKEN_BUDGET:
+                PREFETCH_TURNS.inc(outcome="over_budget")
+                print(f"    (Prefetch: token budget spent for thread {thread_id})")
+                break
+            key = interview_key(topic, analyst)
+            # Unchanged analysts after feedback, or interviews that will be reused anyway
+            if _scratch().get("turn", key) is not None or get_interview(topic, analyst, count=False):
+                continue
+
+            state = {"topic": topic, "analyst": analyst, "messages": [helper.opening_message(topic)]}
+            question = RunnableLambda(helper.generate_question).invoke(state, config)["messages"][0]
+            if cancelled.is_set():
+                break
+            state["messages"].append(question)
+            queries = RunnableLambda(helper.plan_queries).invoke(state, config)["search_queries"]
+            _scratch().set("turn", key, {"question": question.content, "search_queries": queries.model_dump()}, ttl=PREFETCH_TTL)
+            PREFETCH_TURNS.inc(outcome="prefetched")
+
+            # Results land in the shared search cache, where the real run will find them
+            state["search_queries"] = queries
+            helper.search_web(state)
+            helper.search_wikipedia(state)
+    except Exception as e:
+        # Speculation is best effort; the real run simply does the work itself
+        print(f"    (Prefetch failed for thread {thread_id}: {e})")
+    finally:
+        with _lock:
+            # Not recorded once finish() has dropped the thread
+            if thread_id in _spent:
+                _spent[thread_id] = (_spent[thread_id][0] + used(), time.monotonic())
+            if _runs.get(thread_id) is cancelled:
+                del _runs[thread_id]
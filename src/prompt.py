@@ -2,7 +2,13 @@
 analyst_instructions = """You are tasked with creating a set of AI analyst personas. 
 Review the topic: {topic}
 Review feedback: {human_analyst_feedback}
-Pick the top {max_analysts} themes and assign one analyst to each."""
+Pick the top {max_analysts} themes and assign one analyst to each.{current_analysts}"""
+
+# Appended to analyst_instructions when feedback revises an existing set, so unchanged
+# personas come back verbatim and their interviews can be reused
+current_analysts_instructions = """
+Current analysts (return any analyst the feedback does not ask to change exactly as written):
+{analysts}"""
 
 question_instructions = """You are an analyst interviewing an expert. 
 Your goal is to gather interesting and specific insights.
@@ -13,6 +19,12 @@ answer_instructions = """You are an expert answering an analyst.
 Use ONLY this context: {context}
 Cite sources like [1] next to statements. List sources at the bottom."""
 
+query_planner_instructions = """You plan the searches for an analyst's latest interview question.
+From the conversation, produce:
+1. web_query: a concise web search query.
+2. wikipedia_term: a concise Wikipedia search term (an entity or concept, not a question).
+3. extra_queries: up to {max_extra_queries} additional web queries covering other angles of the question (may be empty)."""
+
 # --- WRITING PROMPTS ---
 section_writer_instructions = """You are an expert technical writer. 
 Your task is to create a section of a report based *strictly* on the provided source documents.
@@ -63,4 +75,16 @@ Memos to process:
 {context}"""
 
 intro_conclusion_instructions = """Write a crisp {topic} Introduction or Conclusion.
-Use headers: ## Introduction or ## Conclusion."""
\ No newline at end of file
+Use headers: ## Introduction or ## Conclusion.
+Base it on this digest of the research:
+{formatted_str_sections}"""
+
+# Map-reduce synthesis: merges a batch of memos into one, keeping facts and citations
+condense_instructions = """You are condensing research memos on: {topic}
+Merge the memos below into ONE memo of at most {max_words} words.
+- Keep the most important statistics, dates, names and conflicting claims.
+- Group related points; drop repetition.
+- Keep source URLs next to the facts they support.
+
+Memos:
+{memos}"""
\ No newline at end of file
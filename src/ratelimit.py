@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import OrderedDict, deque
+
+from src.metrics import registry, LLM_QUEUE_WAIT, LLM_THROTTLED, LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, LLM_CONCURRENCY
+
+# --- TOKEN BUCKET ---
+
+class TokenBucket:
+    """Refills `per_minute` units evenly over sixty seconds, up to one minute of burst."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 when they already are)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        # Balance may go negative when a call used more than it reserved;
+        # the debt is simply paid back by future refills.
+        self._refill()
+        self.tokens -= amount
+
+    def refund(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def available(self) -> float:
+        """Fraction of the per-minute budget currently unused (0 while in debt)."""
+        self._refill()
+        return max(0.0, self.tokens) / self.capacity if self.capacity else 0.0
+
+
+# --- SCHEDULER ---
+
+class Ticket:
+    __slots__ = ("key", "tokens", "granted_at", "waited")
+
+    def __init__(self, key, tokens):
+        self.key = key
+        self.tokens = tokens
+        self.granted_at = 0.0
+        self.waited = 0.0
+
+
+class ModelScheduler:
+    """
+    Process-wide admission control for one model.
+
+    Callers are admitted when the requests-per-minute and tokens-per-minute
+    buckets allow it and the adaptive concurrency limit has a free slot.
+    Waiters are served round-robin across keys (research threads), so one
+    thread fanning out many interviews cannot starve another user's run.
+    The concurrency limit grows additively on healthy calls and is halved
+    (with a cooldown pause) whenever the provider answers with a 429.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float, max_concurrency: int = 8,
+                 min_concurrency: int = 1, latency_slo: float = 30.0):
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.token_budget = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_slo = latency_slo
+
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # key -> deque of tickets, in round-robin order
+        self._in_flight = 0
+        self._limit = float(max(min_concurrency, min(max_concurrency, 4)))
+        self._paused_until = 0.0
+        self._consecutive_throttles = 0
+
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "failed": 0,
+            "tokens": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "total_latency": 0.0,
+        }
+
+    # -- queue helpers (call with the condition held) --
+
+    def _head(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _remove(self, ticket):
+        queue = self._queues.get(ticket.key)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self._queues[ticket.key]
+
+    def _pop_head(self, ticket):
+        queue = self._queues.pop(ticket.key)
+        queue.popleft()
+        if queue:
+            # Rotate the key to the back so other threads get the next slot
+            self._queues[ticket.key] = queue
+
+    def _ready_in(self, tokens):
+        """Seconds until the head waiter may run, or None to wait for a release."""
+        now = time.monotonic()
+        if self._paused_until > now:
+            return self._paused_until - now
+        if self._in_flight >= int(self._limit):
+            return None
+        return max(self.requests.wait_time(1), self.token_budget.wait_time(tokens))
+
+    # -- public API --
+
+    def acquire(self, tokens: int, key: str = "default") -> Ticket:
+        ticket = Ticket(key or "default", tokens)
+        start = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(ticket.key, deque()).append(ticket)
+            try:
+                while True:
+                    if self._head() is ticket:
+                        delay = self._ready_in(tokens)
+                        if delay == 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+            except BaseException:
+                self._remove(ticket)
+                self._cond.notify_all()
+                raise
+
+            self._pop_head(ticket)
+            self.requests.consume(1)
+            self.token_budget.consume(tokens)
+            self._in_flight += 1
+
+            ticket.granted_at = time.monotonic()
+            ticket.waited = ticket.granted_at - start
+            self._stats["requests"] += 1
+            self._stats["total_wait"] += ticket.waited
+            self._stats["max_wait"] = max(self._stats["max_wait"], ticket.waited)
+            self._cond.notify_all()
+
+        LLM_QUEUE_WAIT.observe(ticket.waited, model=self.name)
+        if ticket.waited > 5:
+            print(f"    (Rate limiter: waited {ticket.waited:.1f}s for {self.name})")
+        return ticket
+
+    def release(self, ticket: Ticket, tokens_used: int = None, throttled: bool = False,
+                failed: bool = False, retry_after: float = None):
+        latency = time.monotonic() - ticket.granted_at
+        with self._cond:
+            self._in_flight -= 1
+
+            if tokens_used is not None:
+                delta = tokens_used - ticket.tokens
+                if delta > 0:
+                    self.token_budget.consume(delta)
+                elif delta < 0:
+                    self.token_budget.refund(-delta)
+                self._stats["tokens"] += tokens_used
+
+            if throttled:
+                LLM_THROTTLED.inc(model=self.name)
+                self._consecutive_throttles += 1
+                self._stats["throttled"] += 1
+                self._limit = max(self.min_concurrency, self._limit / 2)
+                cooldown = retry_after or min(60.0, 2.0 ** self._consecutive_throttles)
+                self._paused_until = max(self._paused_until, time.monotonic() + cooldown)
+            elif failed:
+                self._stats["failed"] += 1
+            else:
+                self._consecutive_throttles = 0
+                self._stats["total_latency"] += latency
+                if latency > self.latency_slo:
+                    self._limit = max(self.min_concurrency, self._limit - 1)
+                else:
+                    self._limit = min(self.max_concurrency, self._limit + 1 / self._limit)
+
+            self._cond.notify_all()
+
+    def headroom(self) -> float:
+        """Remaining share (0-1) of the tighter of the two budgets; 0 while paused after a 429."""
+        with self._cond:
+            if self._paused_until > time.monotonic():
+                return 0.0
+            return min(self.requests.available(), self.token_budget.available())
+
+    def stats(self) -> dict:
+        with self._cond:
+            requests = self._stats["requests"] or 1
+            completed = max(1, requests - self._stats["throttled"] - self._stats["failed"] - self._in_flight)
+            return {
+                "queue_depth": sum(len(q) for q in self._queues.values()),
+                "in_flight": self._in_flight,
+                "concurrency_limit": int(self._limit),
+                "paused_for": max(0.0, round(self._paused_until - time.monotonic(), 2)),
+                "requests": self._stats["requests"],
+                "throttled": self._stats["throttled"],
+                "failed": self._stats["failed"],
+                "tokens": self._stats["tokens"],
+                "avg_wait": round(self._stats["total_wait"] / requests, 3),
+                "max_wait": round(self._stats["max_wait"], 3),
+                "avg_latency": round(self._stats["total_latency"] / completed, 3),
+            }
+
+
+# --- REGISTRY ---
+
+_schedulers = {}
+_registry_lock = threading.Lock()
+
+def get_scheduler(name: str, **kwargs) -> ModelScheduler:
+    """Returns the process-wide scheduler for `name`, creating it on first use."""
+    with _registry_lock:
+        if name not in _schedulers:
+            _schedulers[name] = ModelScheduler(name, **kwargs)
+        return _schedulers[name]
+
+def scheduler_stats() -> dict:
+    with _registry_lock:
+        schedulers = dict(_schedulers)
+    return {name: s.stats() for name, s in schedulers.items()}
+
+def _collect_gauges():
+    for name, stats in scheduler_stats().items():
+        LLM_QUEUE_DEPTH.set(stats["queue_depth"], model=name)
+        LLM_IN_FLIGHT.set(stats["in_flight"], model=name)
+        LLM_CONCURRENCY.set(stats["concurrency_limit"], model=name)
+
+registry.add_collector(_collect_gauges)
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from src.metrics import (
+    NODE_DURATION, NODE_ERRORS,
+    LLM_DURATION, LLM_REQUESTS, LLM_TOKENS, LLM_RETRIES,
+)
+
+# --- RUN TRACER ---
+
+class RunTracer(BaseCallbackHandler):
+    """
+    Callback handler that instruments one graph run.
+
+    Every node (including interview subgraph nodes), LLM call and retry is
+    recorded in the process-wide Prometheus metrics, labeled by node and model,
+    and also accumulated here so the run can report its own timing breakdown.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes = {}   # run_id -> (node, start)
+        self._llms = {}    # run_id -> (node, model, start)
+        self.started_at = time.perf_counter()
+        self.durations = {}
+        self.llm = {"calls": 0, "errors": 0, "retries": 0, "input_tokens": 0, "output_tokens": 0, "seconds": 0.0}
+
+    # -- nodes --
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, tags=None, **kwargs):
+        self._count_retry(tags, metadata)
+        node = (metadata or {}).get("langgraph_node")
+        if not node:
+            return
+        if kwargs.get("name") == node:
+            with self._lock:
+                self._nodes[run_id] = (node, time.perf_counter())
+
+    def _end_chain(self, run_id, failed: bool):
+        with self._lock:
+            started = self._nodes.pop(run_id, None)
+            if started is None:
+                return
+            node, start = started
+            duration = time.perf_counter() - start
+            self.durations.setdefault(node, []).append(duration)
+        NODE_DURATION.observe(duration, node=node)
+        if failed:
+            NODE_ERRORS.inc(node=node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id, failed=False)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        # LangGraph signals interrupts with an exception; that is not a failure
+        self._end_chain(run_id, failed=type(error).__name__ != "GraphInterrupt")
+
+    def _count_retry(self, tags, metadata):
+        # `with_retry` emits no on_retry callback; it tags every attempt after the first instead
+        if not any(tag.startswith("retry:attempt:") for tag in tags or ()):
+            return
+        with self._lock:
+            self.llm["retries"] += 1
+        LLM_RETRIES.inc(node=(metadata or {}).get("langgraph_node", ""))
+
+    # -- LLM calls --
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, tags=None, **kwargs):
+        self._count_retry(tags, metadata)
+        metadata = metadata or {}
+        with self._lock:
+            self._llms[run_id] = (metadata.get("langgraph_node", ""), metadata.get("ls_model_name", "unknown"), time.perf_counter())
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, tags=None, **kwargs):
+        self.on_chat_model_start(serialized, prompts, run_id=run_id, metadata=metadata, tags=tags, **kwargs)
+
+    def _end_llm(self, run_id, status: str, usage: dict = None, served: str = None):
+        with self._lock:
+            started = self._llms.pop(run_id, None)
+            if started is None:
+                return
+            node, model, start = started
+            # A pooled model only knows which member answered once the call is done
+            model = served or model
+            duration = time.perf_counter() - start
+            self.llm["calls"] += 1
+            self.llm["seconds"] += duration
+            if status != "ok":
+                self.llm["errors"] += 1
+            if usage:
+                self.llm["input_tokens"] += usage.get("input_tokens", 0)
+                self.llm["output_tokens"] += usage.get("output_tokens", 0)
+        LLM_DURATION.observe(duration, node=node, model=model)
+        LLM_REQUESTS.inc(node=node, model=model, status=status)
+        if usage:
+            LLM_TOKENS.inc(usage.get("input_tokens", 0), node=node, model=model, type="input")
+            LLM_TOKENS.inc(usage.get("output_tokens", 0), node=node, model=model, type="output")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = served = None
+        try:
+            message = response.generations[0][0].message
+            usage = message.usage_metadata
+            served = message.response_metadata.get("model_name")
+        except (IndexError, AttributeError):
+            pass
+        served = served or (response.llm_output or {}).get("model_name")
+        self._end_llm(run_id, "ok", usage, served)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        status = "throttled" if getattr(error, "status_code", None) == 429 else "error"
+        self._end_llm(run_id, status)
+
+    # -- reporting --
+
+    def breakdown(self) -> dict:
+        """Per-run summary: wall time, time per node and LLM totals."""
+        with self._lock:
+            nodes = {
+                node: {"count": len(values), "total_s": round(sum(values), 3), "max_s": round(max(values), 3)}
+                for node, values in sorted(self.durations.items())
+            }
+            llm = dict(self.llm, seconds=round(self.llm["seconds"], 3))
+        return {"wall_s": round(time.perf_counter() - self.started_at, 3), "nodes": nodes, "llm": llm}
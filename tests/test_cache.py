@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from src.cache import SingleFlight, SQLiteCache
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", work)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", work))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    # Followers are parked on the leader's future before it finishes
+    time.sleep(0.05)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False)] + [("result", True)] * 3
+    # Once finished the key is free again
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_single_flight_raises_the_error_and_frees_the_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: 1) == (1, False)
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"))
+    cache.set("search", "fresh", {"v": 1}, ttl=60)
+    cache.set("search", "stale", {"v": 2}, ttl=0.05)
+    cache.set("search", "forever", {"v": 3})
+    time.sleep(0.1)
+    assert cache.get("search", "fresh") == {"v": 1}
+    assert cache.get("search", "stale") is None
+    assert cache.get("search", "forever") == {"v": 3}
+
+
+def test_least_recently_used_entry_is_evicted_per_namespace(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), max_entries={"search": 2})
+    cache.set("search", "a", 1)
+    time.sleep(0.01)
+    cache.set("search", "b", 2)
+    time.sleep(0.01)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("search", "a") == 1
+    time.sleep(0.01)
+    cache.set("search", "c", 3)
+    assert cache.get("search", "b") is None
+    assert cache.get("search", "a") == 1
+    assert cache.get("search", "c") == 3
+
+    # Other namespaces have their own (here unlimited) capacity
+    for i in range(5):
+        cache.set("reports", str(i), i)
+    assert [cache.get("reports", str(i)) for i in range(5)] == [0, 1, 2, 3, 4]
+
+
+def test_failed_tavily_search_is_not_cached(tmp_path, monkeypatch):
+    from src import cache, helper
+
+    class Tool:
+        def __init__(self, result):
+            self.result = result
+
+        def invoke(self, _):
+            return self.result
+
+    monkeypatch.setattr(cache, "_search_store", SQLiteCache(str(tmp_path / "search.sqlite")))
+    # TavilySearchResults reports API errors as the exception's repr instead of raising
+    monkeypatch.setattr(helper, "get_tavily_search", lambda: Tool("HTTPError('502 Bad Gateway')"))
+    with pytest.raises(RuntimeError):
+        cache.cached_search("tavily", "solar storage", lambda: helper.fetch_tavily("solar storage"))
+
+    results = [{"url": "https://a.example", "content": "solar storage"}]
+    monkeypatch.setattr(helper, "get_tavily_search", lambda: Tool(results))
+    assert cache.cached_search("tavily", "solar storage", lambda: helper.fetch_tavily("solar storage")) == results
+    assert cache.cached_search("tavily", "storage solar", lambda: helper.fetch_tavily("unused")) == results
@@ -0,0 +1,47 @@
+import sqlite3
+import threading
+
+import pytest
+
+from src.checkpoint import BoundedSqliteSaver, DocumentMemorySaver
+
+
+def doc(url, content):
+    return {"attr": "href", "url": url, "content": content}
+
+
+@pytest.fixture(params=["sqlite", "memory"])
+def saver(request, tmp_path):
+    if request.param == "memory":
+        return DocumentMemorySaver()
+    return BoundedSqliteSaver(sqlite3.connect(str(tmp_path / "checkpoints.sqlite"), check_same_thread=False))
+
+
+def test_interviews_of_a_run_share_one_copy_of_each_document(saver):
+    # Two interviews of the same run find overlapping sources at the same time
+    found = [
+        [doc("https://a.example", "alpha"), doc("https://b.example", "beta")],
+        [doc("https://a.example", "alpha, fetched again"), doc("https://mirror.example", "beta")],
+    ]
+    ids = [None, None]
+
+    def interview(i):
+        ids[i] = saver.put_documents("run", found[i])
+
+    threads = [threading.Thread(target=interview, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert ids[0] == ids[1]
+    stored = saver.get_documents("run", ids[0] + ["0123456789abcdef"])
+    assert sorted(d["content"] for d in stored.values()) in (["alpha", "beta"], ["alpha, fetched again", "beta"])
+
+
+def test_documents_are_kept_per_run_and_deleted_with_it(saver):
+    ids = saver.put_documents("run", [doc("https://a.example", "alpha")])
+    assert saver.get_documents("other run", ids) == {}
+
+    saver.delete_thread("run")
+    assert saver.get_documents("run", ids) == {}
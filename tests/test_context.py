@@ -0,0 +1,53 @@
+from src.context import BM25, estimate_tokens, pack_context, render_documents, store_documents
+
+
+def doc(url, content):
+    return {"attr": "href", "url": url, "content": content}
+
+
+def paragraphs(topic, count, words=60):
+    # Chunks are cut on paragraph boundaries, so each paragraph is one ~125-token chunk
+    return "\n\n".join(" ".join([topic] * 3 + [f"filler{i}"] * words) for i in range(count))
+
+
+def test_bm25_ranks_matching_texts_first():
+    scores = BM25([
+        "solar storage costs fell sharply",
+        "gene therapy trials expanded",
+        "solar panels and solar storage batteries",
+    ]).scores("solar storage")
+    assert scores[1] == 0
+    assert scores[2] > scores[0] > 0
+
+
+def test_pack_context_keeps_the_most_relevant_chunks_within_budget():
+    documents = {}
+    new, ids = store_documents(documents, [
+        doc("https://a.example", paragraphs("battery", 4)),
+        doc("https://b.example", paragraphs("weather", 4)),
+    ])
+    documents.update(new)
+
+    packed, urls = pack_context(ids, "battery", budget=200, documents=documents)
+    # One battery chunk fits the budget; a second would not, and no weather chunk outranks it
+    assert estimate_tokens(packed) <= 200 + 20  # the <Document> tags are not budgeted
+    assert "battery" in packed and "weather" not in packed
+    assert urls == ["https://a.example"]
+
+
+def test_pack_context_drops_duplicate_documents():
+    text = paragraphs("battery", 1)
+    context = [render_documents([doc("https://a.example", text)]),
+               render_documents([doc("https://mirror.example", text.upper())])]
+
+    packed, urls = pack_context(context, "battery", budget=1000)
+    assert urls == ["https://a.example"]
+    assert packed.count("<Document") == 1
+
+
+def test_store_documents_reuses_entries_by_url_and_content():
+    first, ids = store_documents({}, [doc("https://a.example", "alpha"), doc("https://b.example", "beta")])
+    store = dict(first)
+    new, again = store_documents(store, [doc("https://a.example", "alpha, updated"), doc("", "beta")])
+    assert new == {}
+    assert again == ids
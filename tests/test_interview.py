@@ -0,0 +1,51 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src import helper
+from src.helper import stop_reason
+
+
+@pytest.fixture(autouse=True)
+def defaults(monkeypatch):
+    # Pin the settings so the checks do not depend on the environment
+    monkeypatch.setattr(helper, "PLANNED_INTERVIEW_TURNS", 3)
+    monkeypatch.setattr(helper, "MIN_INTERVIEW_TURNS", 2)
+    monkeypatch.setattr(helper, "MAX_INTERVIEW_TURNS", 4)
+    monkeypatch.setattr(helper, "MIN_NOVELTY", 0.3)
+    monkeypatch.setattr(helper, "EXTRA_TURN_NOVELTY", 0.6)
+    monkeypatch.setattr(helper, "MIN_NEW_CHARS", 500)
+
+
+def turn(new_docs, docs=6, chars_per_doc=1000):
+    return {"docs": docs, "new_docs": new_docs, "new_urls": new_docs, "new_chars": new_docs * chars_per_doc}
+
+
+def state(*turns, question="What changed last year?", **extra):
+    return {"messages": [HumanMessage(content=question), AIMessage(content="An answer.")], "turn_stats": list(turns), **extra}
+
+
+def test_keeps_going_while_turns_find_new_material():
+    assert stop_reason(state(turn(6))) is None
+    assert stop_reason(state(turn(6), turn(3))) is None
+
+
+def test_first_turn_is_never_judged_on_novelty():
+    assert stop_reason(state(turn(0))) is None
+
+
+def test_stops_early_when_a_turn_finds_little_new():
+    assert stop_reason(state(turn(6), turn(1))) == "diminishing_returns"
+    # Enough new documents, but too little new text in them
+    assert stop_reason(state(turn(6), turn(4, chars_per_doc=100))) == "diminishing_returns"
+
+
+def test_extra_turn_only_while_mostly_new():
+    assert stop_reason(state(turn(6), turn(5), turn(3))) == "max_turns"
+    assert stop_reason(state(turn(6), turn(5), turn(5))) is None
+    assert stop_reason(state(turn(6), turn(5), turn(5), turn(6))) == "turn_cap"
+
+
+def test_planned_length_from_state_and_analyst_ending():
+    assert stop_reason(state(turn(6), turn(3), max_num_turns=2)) == "max_turns"
+    assert stop_reason(state(turn(6), turn(5), max_num_turns=2)) is None
+    assert stop_reason(state(turn(6), question="Thank you so much for your help!")) == "analyst_done"
@@ -0,0 +1,34 @@
+import time
+
+from src import jobs
+from src.jobs import JobStore
+
+
+def test_prune_keeps_running_jobs_past_the_ttl(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_TTL_SECONDS", 0.05)
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    store.set_status("running", "running")
+    store.append("running", 0, "progress", {"message": "started"})
+    store.set_status("finished", "done")
+    store.append("finished", 0, "result", {"html": "report"})
+    time.sleep(0.1)
+
+    store.prune()
+    assert store.status("running") == "running"
+    assert store.events("running") == [("progress", {"message": "started"})]
+    assert store.status("finished") is None
+    assert store.events("finished") == []
+
+
+def test_prune_drops_unfinished_jobs_without_activity(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_STALE_SECONDS", 0.1)
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    store.set_status("orphaned", "running")
+    store.set_status("active", "running")
+    time.sleep(0.15)
+    # New events keep a long run alive
+    store.append("active", 0, "progress", {"message": "still going"})
+
+    store.prune()
+    assert store.status("orphaned") is None
+    assert store.status("active") == "running"
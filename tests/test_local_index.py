@@ -0,0 +1,31 @@
+import threading
+
+from src import local_index
+
+
+def test_lookups_read_the_index_while_it_is_built_in_the_background(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "batteries.md").write_text("Solid state batteries use a solid electrolyte.\n\nThey promise higher energy density.")
+    (docs / "notes.txt").write_text("Unrelated notes about gardening.")
+
+    monkeypatch.setattr(local_index, "LOCAL_DOCS_DIR", str(docs))
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_PATH", str(tmp_path / "index.sqlite"))
+    monkeypatch.setattr(local_index, "LOCAL_INDEX_REFRESH", 0)
+    monkeypatch.setattr(local_index, "_index", local_index.LocalIndex(str(tmp_path / "index.sqlite")))
+    monkeypatch.setattr(local_index, "_refresher", None)
+    monkeypatch.setattr(local_index, "_ready", threading.Event())
+
+    # Hold the build so the lookup runs against an index that is not finished yet
+    release = threading.Event()
+    sync = local_index.LocalIndex.sync
+    monkeypatch.setattr(local_index.LocalIndex, "sync", lambda self, d: release.wait(5) and sync(self, d))
+
+    assert local_index.search_local("solid state batteries") == []
+    refresher = local_index._refresher
+    assert refresher is not None and refresher.is_alive()
+
+    release.set()
+    refresher.join(5)
+    results = local_index.search_local("solid state batteries")
+    assert [r["url"] for r in results] == [f"file://{docs / 'batteries.md'}#chunk-0"]
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from src.ratelimit import ModelScheduler
+
+
+def scheduler(**kwargs):
+    return ModelScheduler("test", rpm=60000, tpm=10_000_000, **kwargs)
+
+
+def wait_for_queue(s, depth):
+    deadline = time.monotonic() + 5
+    while s.stats()["queue_depth"] < depth:
+        assert time.monotonic() < deadline, "waiter never queued"
+        time.sleep(0.001)
+
+
+def test_waiters_are_served_round_robin_across_keys():
+    s = scheduler(max_concurrency=1)
+    holder = s.acquire(10, "holder")
+    order = []
+
+    def call(key):
+        ticket = s.acquire(10, key)
+        order.append(key)
+        s.release(ticket)
+
+    # Thread "a" fans out three calls before thread "b" asks for one
+    threads = []
+    for depth, key in enumerate(["a", "a", "a", "b"], 1):
+        thread = threading.Thread(target=call, args=(key,))
+        thread.start()
+        threads.append(thread)
+        wait_for_queue(s, depth)
+
+    s.release(holder)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["a", "b", "a", "a"]
+
+
+def test_throttle_halves_the_concurrency_limit_and_pauses():
+    s = scheduler(max_concurrency=8)
+    assert s.stats()["concurrency_limit"] == 4
+
+    s.release(s.acquire(10), throttled=True, retry_after=0.2)
+    stats = s.stats()
+    assert stats["concurrency_limit"] == 2
+    assert stats["throttled"] == 1
+    assert stats["paused_for"] > 0
+    assert s.headroom() == 0.0
+
+    # Admission waits out the pause, then another 429 halves again (down to the floor)
+    ticket = s.acquire(10)
+    assert ticket.waited >= 0.1
+    s.release(ticket, throttled=True, retry_after=0.01)
+    assert s.stats()["concurrency_limit"] == 1
+
+
+def test_healthy_calls_grow_the_limit_additively():
+    s = scheduler(max_concurrency=8)
+    for _ in range(4):
+        s.release(s.acquire(10))
+    assert s.stats()["concurrency_limit"] == 4
+    for _ in range(4):
+        s.release(s.acquire(10))
+    assert s.stats()["concurrency_limit"] == 5